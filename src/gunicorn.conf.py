@@ -0,0 +1,61 @@
+"""
+Gunicorn configuration of production server, see https://docs.gunicorn.org/en/stable/settings.html.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'simple_resources_api.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# Application is loaded before forking, so its memory is shared by workers.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+pidfile = os.getenv('GUNICORN_PID_FILE', '/tmp/gunicorn.pid')
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+
+def on_starting(server):
+    # Metrics files of previous run must be removed, see prometheus_client multiprocess mode.
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from django.db import connections
+    from simple_resources_api.postgresql_pool.pool import close_pools
+    from simple_resources_api.warmup import warmup
+
+    warmup()
+    # Connections of master process must not be shared by forked workers.
+    connections.close_all()
+    close_pools()
+
+
+def post_fork(server, worker):
+    from django.db import connections
+    from simple_resources_api.warmup import warmup, warmup_database
+
+    if preload_app:
+        warmup_database()
+    else:
+        warmup()
+    # Main thread of gthread worker doesn't serve requests, so its pooled connections are returned to the pool.
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
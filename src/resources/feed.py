@@ -0,0 +1,157 @@
+"""
+Feed of resources changes: batches of changes after sequence number, long polling and Server-Sent Events stream.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from simple_resources_api.renderers import EventStreamRenderer
+from .models import ResourceChange
+
+# Transaction id and sequence number of change.
+Position = Tuple[int, int]
+
+
+class ChangesPruned(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Changes after the sequence number are pruned, objects must be listed again.'
+    default_code = 'changes_pruned'
+
+
+class TooManyStreams(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many streams of changes, retry later or use long polling.'
+    default_code = 'too_many_streams'
+
+    def __init__(self, wait: int):
+        super().__init__()
+        # Retry-After header is set by exception handler.
+        self.wait = wait
+
+
+class StreamSlots:
+    """
+    Counter of Server-Sent Events streams and waiting long polls of process, every one holds a server thread till
+    it is finished.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self, limit: int) -> bool:
+        with self._lock:
+            if self.active >= limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+
+stream_slots = StreamSlots()
+
+
+class LimitedStream:
+    """
+    Stream of events, which releases its slot when response is closed.
+    """
+
+    def __init__(self, events: Iterator[bytes]):
+        self._events = events
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self._events
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._events.close()
+            stream_slots.release()
+
+
+def release_connection(alias: str) -> None:
+    # Pooled connection is returned to pool while request waits for changes.
+    connection = connections[alias]
+    if not connection.in_atomic_block:
+        connection.close_if_unusable_or_obsolete()
+
+
+def finished(queryset: QuerySet) -> QuerySet:
+    """
+    Filters changes of transactions older than the oldest running one. They are committed or rolled back,
+    so changes, which become visible later, have greater transaction ids.
+    """
+    return queryset.extra(where=['txid < txid_snapshot_xmin(txid_current_snapshot())'])
+
+
+def get_head(db: str) -> int:
+    """
+    Returns sequence number of the last finished change, feed is started from it. 0 is the start of the log.
+    """
+    queryset = finished(ResourceChange.objects.using(db))
+    return queryset.order_by('-txid', '-id').values_list('id', flat=True).first() or 0
+
+
+def get_position(db: str, since: int) -> Position:
+    """
+    Returns transaction id and sequence number of the change, the feed is ordered by them.
+    """
+    if not since:
+        return 0, 0
+    txid = ResourceChange.objects.using(db).filter(id=since).values_list('txid', flat=True).first()
+    # The last change is never pruned, so missing change is pruned.
+    if txid is None:
+        raise ChangesPruned()
+    return txid, since
+
+
+def read_changes(queryset: QuerySet, position: Position, limit: int) -> List[ResourceChange]:
+    queryset = finished(queryset).extra(where=['(txid, id) > (%s, %s)'], params=list(position))
+    return list(queryset.order_by('txid', 'id')[:limit])
+
+
+def wait_changes(queryset: QuerySet, position: Position, limit: int, timeout: float) -> List[ResourceChange]:
+    """
+    Polls changes until they appear or timeout is over.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        changes = read_changes(queryset, position, limit)
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            return changes
+        release_connection(queryset.db)
+        time.sleep(min(settings.FEED_POLL_INTERVAL, remaining))
+
+
+def iter_events(
+        queryset: QuerySet, position: Position, limit: int, timeout: float,
+        to_representation: Callable[[ResourceChange], Dict[str, Any]],
+) -> Iterator[bytes]:
+    """
+    Yields changes as Server-Sent Events and heartbeat comments while there are no changes. Stream is finished
+    after timeout, client reconnects with Last-Event-ID header.
+    """
+    yield f'retry: {int(settings.FEED_POLL_INTERVAL * 1000)}\n\n'.encode()
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        changes = wait_changes(queryset, position, limit, min(settings.FEED_HEARTBEAT_INTERVAL, remaining))
+        if not changes:
+            yield b': heartbeat\n\n'
+            continue
+        for change in changes:
+            yield EventStreamRenderer.render_event(change.id, change.type, to_representation(change))
+        position = changes[-1].txid, changes[-1].id
@@ -0,0 +1,43 @@
+from typing import List, Optional
+
+from django.db.models import QuerySet
+from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
+from rest_framework.request import Request
+
+from .models import Resource, UserQuota
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+class ResourceFilter(filters.FilterSet):
+    id__in = NumberInFilter(field_name='id', lookup_expr='in')
+
+    class Meta:
+        model = Resource
+        fields = {
+            'user_id': ['exact'],
+            'name': ['exact', 'startswith', 'contains'],
+        }
+
+
+class UserQuotaUtilizationFilter(filters.FilterSet):
+    min_utilization = filters.NumberFilter(field_name='utilization', lookup_expr='gte')
+
+    class Meta:
+        model = UserQuota
+        fields = ('user_id',)
+
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    Ordering filter, which orders by primary key in the end, so pages of equal values are stable.
+    """
+
+    def get_ordering(self, request: Request, queryset: QuerySet, view) -> Optional[List[str]]:
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {'pk', '-pk', 'id', '-id'} & set(ordering):
+            ordering = [*ordering, 'pk']
+        return ordering
@@ -0,0 +1,69 @@
+import json
+from typing import Any, Dict, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from simple_resources_api.benchmark import SCENARIOS, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks hot endpoints by concurrent clients on seeded test database, which is created and dropped '
+        'by the command. Reports latency percentiles, requests per second and queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Number of seeded users.')
+        parser.add_argument('--resources-per-user', type=int, default=200, help='Number of seeded user resources.')
+        parser.add_argument('--requests', type=int, default=200, help='Number of requests of every scenario.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Number of concurrent clients.')
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), help='Scenarios to run, all by default.')
+        parser.add_argument('--output', help='Path of JSON file with results.')
+        parser.add_argument('--compare', help='Path of JSON file with results of previous run to compare with.')
+
+    def handle(self, *args, users: int, resources_per_user: int, requests: int, concurrency: int,
+               scenarios: Optional[list], output: Optional[str], compare: Optional[str], **options):
+        baseline = None
+        if compare:
+            try:
+                with open(compare, encoding='utf-8') as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read results to compare with: {e}')
+
+        verbosity = options['verbosity']
+        old_config = setup_databases(verbosity=verbosity, interactive=False)
+        try:
+            results = run_benchmark(users, resources_per_user, requests, concurrency, scenarios, log=self.stderr.write)
+        finally:
+            teardown_databases(old_config, verbosity=verbosity)
+
+        self.write_results(results, baseline)
+        if output:
+            with open(output, 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results are saved to {output}.'))
+
+    def write_results(self, results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+        self.stdout.write(f'{"scenario":<28}{"rps":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+                          f'{"queries":>9}{"errors":>8}')
+        for name, result in results['scenarios'].items():
+            latency = result['latency_ms']
+            self.stdout.write(f'{name:<28}{result["rps"]:>10}{latency["p50"]:>10}{latency["p95"]:>10}'
+                              f'{latency["p99"]:>10}{result["queries_per_request"]:>9}{result["errors"]:>8}')
+
+            if result.get('throttled'):
+                self.stdout.write(self.style.WARNING(f'  {result["throttled"]} requests are throttled'))
+
+            previous = (baseline or {}).get('scenarios', {}).get(name)
+            if previous:
+                self.stdout.write(f'{"  change":<28}{self.change(previous["rps"], result["rps"]):>10}' + ''.join(
+                    f'{self.change(previous["latency_ms"][key], latency[key]):>10}' for key in ('p50', 'p95', 'p99')
+                ) + f'{self.change(previous["queries_per_request"], result["queries_per_request"]):>9}')
+
+    @staticmethod
+    def change(previous: float, current: float) -> str:
+        if not previous:
+            return '-'
+        return f'{(current - previous) / previous * 100:+.1f}%'
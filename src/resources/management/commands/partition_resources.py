@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, router
+
+from resources.models import Resource
+from resources.partitioning import (
+    PARTITIONED, UNPARTITIONED, PartitioningError, copy_rows, drop_table, get_table, prepare, swap,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Migrates resources table to table hash-partitioned by user_id online: writes are mirrored by trigger, '
+        'existing rows are copied by batches, then tables are swapped. The old table is kept till --drop-old.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int, default=settings.RESOURCES_PARTITIONS,
+                            help='Count of partitions.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Number of rows copied in one transaction.')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds between batches to limit load.')
+        parser.add_argument('--start-id', type=int, default=0, help='Resume copying after this id.')
+        parser.add_argument('--lock-timeout', type=float, default=5,
+                            help='Max seconds to wait for lock of resources table on swap.')
+        parser.add_argument('--no-swap', action='store_true', help='Copy rows, but keep the current table.')
+        parser.add_argument('--drop-old', action='store_true', help='Only drop the old table kept after swap.')
+
+    def handle(self, *args, partitions: int, batch_size: int, pause: float, start_id: int, lock_timeout: float,
+               no_swap: bool, drop_old: bool, **options):
+        connection = connections[router.db_for_write(Resource)]
+        if drop_old:
+            drop_table(connection, UNPARTITIONED)
+            self.stdout.write(self.style.SUCCESS(f'Table {get_table(UNPARTITIONED)} is dropped.'))
+            return
+        if partitions < 1:
+            raise CommandError('Count of partitions must be positive.')
+
+        def batch_copied(count: int, last_id: int) -> None:
+            self.stdout.write(f'Copied {count} rows up to id {last_id}.')
+            time.sleep(pause)
+
+        try:
+            prepare(connection, partitions)
+            self.stdout.write(f'Table {get_table(PARTITIONED)} with {partitions} partitions is prepared.')
+            copied = copy_rows(connection, batch_size, start_id, on_batch=batch_copied)
+            self.stdout.write(f'Copied {copied} rows.')
+            if no_swap:
+                return
+            swap(connection, lock_timeout=lock_timeout)
+        except PartitioningError as e:
+            raise CommandError(str(e))
+        except OperationalError as e:
+            raise CommandError(f'Partitioning is interrupted, rerun it with --start-id of the last copied batch: {e}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Resources table is partitioned, the old table is kept as {get_table(UNPARTITIONED)}.'
+        ))
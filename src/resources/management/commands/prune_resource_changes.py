@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from resources.feed import get_head
+from resources.models import ResourceChange
+
+
+class Command(BaseCommand):
+    help = (
+        'Prunes old changes of resources feed. The last change is always kept, so clients, which missed pruned '
+        'changes, are detected.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.FEED_RETENTION_DAYS,
+                            help='Changes older than this number of days are pruned.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Number of changes deleted by one query.')
+
+    def handle(self, *args, days: int, batch_size: int, **options):
+        threshold = timezone.now() - timedelta(days=days)
+        head = get_head(ResourceChange.objects.db)
+        old_changes = ResourceChange.objects.filter(created_at__lt=threshold).exclude(id=head)
+        boundary = old_changes.aggregate(last=Max('id'))['last'] if head else None
+
+        deleted = 0
+        if boundary is not None:
+            first = old_changes.order_by('id').values_list('id', flat=True).first()
+            for lower in range(first, boundary + 1, batch_size):
+                deleted += old_changes.filter(id__lte=min(lower + batch_size - 1, boundary)).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} changes.'))
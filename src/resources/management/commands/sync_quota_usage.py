@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+from resources.models import UserQuota, Resource
+
+
+class Command(BaseCommand):
+    help = 'Reconciles used counters of user quotas with actual resources counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of quotas updated in one transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report quotas with wrong counters.')
+
+    def handle(self, *args, batch_size: int, dry_run: bool, **options):
+        resources_count = Subquery(
+            Resource.objects.filter(user_id=OuterRef('user_id')).order_by().values('user_id')
+            .annotate(count=Count('id')).values('count'),
+            output_field=IntegerField(),
+        )
+        actual_used = Coalesce(resources_count, 0)
+
+        fixed = 0
+        last_user_id = 0
+        while True:
+            with transaction.atomic():
+                # Locking quotas makes concurrent creates wait, so counted resources and counters stay consistent.
+                user_ids = list(
+                    UserQuota.objects.select_for_update().filter(user_id__gt=last_user_id).order_by('user_id')
+                    .values_list('user_id', flat=True)[:batch_size]
+                )
+                if not user_ids:
+                    break
+                last_user_id = user_ids[-1]
+
+                drifted = UserQuota.objects.filter(user_id__in=user_ids).annotate(actual_used=actual_used)
+                drifted = list(drifted.exclude(used=F('actual_used')).values_list('user_id', 'used', 'actual_used'))
+                for user_id, used, actual in drifted:
+                    self.stdout.write(f'User {user_id}: used counter is {used}, actual resources count is {actual}.')
+
+                if drifted and not dry_run:
+                    UserQuota.objects.filter(user_id__in=[user_id for user_id, *_ in drifted]).update(used=actual_used)
+                fixed += len(drifted)
+
+        action = 'Found' if dry_run else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'{action} {fixed} quotas with wrong used counter.'))
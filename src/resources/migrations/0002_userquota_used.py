@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+
+def fill_used(apps, schema_editor):
+    UserQuota = apps.get_model('resources', 'UserQuota')
+    Resource = apps.get_model('resources', 'Resource')
+    resources_count = Subquery(
+        Resource.objects.filter(user_id=OuterRef('user_id')).order_by().values('user_id').annotate(
+            count=Count('id')
+        ).values('count'),
+        output_field=IntegerField(),
+    )
+    UserQuota.objects.update(used=Coalesce(resources_count, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userquota',
+            name='used',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_used, migrations.RunPython.noop),
+    ]
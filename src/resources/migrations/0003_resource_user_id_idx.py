@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Index is built concurrently to not block resources writes on large tables.
+    atomic = False
+
+    dependencies = [
+        ('resources', '0002_userquota_used'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "resource_user_id_idx" '
+                    'ON "resources_resource" ("user_id", "id");',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "resource_user_id_idx";',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='resource',
+                    index=models.Index(fields=['user', 'id'], name='resource_user_id_idx'),
+                ),
+            ],
+        ),
+    ]
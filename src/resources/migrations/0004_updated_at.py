@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0003_resource_user_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='userquota',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
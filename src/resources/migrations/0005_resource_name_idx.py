@@ -0,0 +1,58 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:05
+
+import warnings
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm is a contrib extension, without it substring search works by sequential scan.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            warnings.warn('pg_trgm extension is not available, resource_name_trgm_idx is not created.')
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS "resource_name_trgm_idx" '
+        'ON "resources_resource" USING gin ("name" gin_trgm_ops);'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS "resource_name_trgm_idx";')
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently to not block resources writes on large tables.
+    atomic = False
+
+    dependencies = [
+        ('resources', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "resource_user_name_idx" '
+                    'ON "resources_resource" ("user_id", "name");',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "resource_user_name_idx";',
+                ),
+                migrations.RunPython(create_trigram_index, drop_trigram_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='resource',
+                    index=models.Index(fields=['user', 'name'], name='resource_user_name_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='resource',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=['name'], name='resource_name_trgm_idx', opclasses=['gin_trgm_ops']
+                    ),
+                ),
+            ],
+        ),
+    ]
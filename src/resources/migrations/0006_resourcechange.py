@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:25
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0005_resource_name_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.IntegerField()),
+                ('type', models.CharField(choices=[('resource.created', 'resource.created'), ('resource.deleted', 'resource.deleted'), ('quota.updated', 'quota.updated')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('name', models.CharField(blank=True, default='', max_length=200)),
+                ('limit', models.PositiveIntegerField(default=None, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='resourcechange',
+            index=models.Index(fields=['user_id', 'id'], name='resource_change_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcechange',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='resource_change_created_idx'),
+        ),
+    ]
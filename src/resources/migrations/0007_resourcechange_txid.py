@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0006_resourcechange'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='resourcechange',
+            name='resource_change_user_id_idx',
+        ),
+        # Existing changes were logged by serialized writers, so they are ordered by id before all new ones.
+        migrations.AddField(
+            model_name='resourcechange',
+            name='txid',
+            field=models.BigIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='resourcechange',
+            index=models.Index(fields=['txid', 'id'], name='resource_change_txid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcechange',
+            index=models.Index(fields=['user_id', 'txid', 'id'], name='resource_change_user_txid_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Index is built concurrently to not block resources writes on large tables.
+    atomic = False
+
+    dependencies = [
+        ('resources', '0007_resourcechange_txid'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "resource_user_name_pattern_idx" '
+                    'ON "resources_resource" ("user_id", "name" varchar_pattern_ops);',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "resource_user_name_pattern_idx";',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='resource',
+                    index=models.Index(fields=['user', 'name'], name='resource_user_name_pattern_idx',
+                                       opclasses=['int4_ops', 'varchar_pattern_ops']),
+                ),
+            ],
+        ),
+    ]
@@ -1,15 +1,206 @@
-from django.db import models
+from collections import Counter
+from typing import Callable, Iterable, Optional
+
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.db import models, transaction, connections
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Now
 
 from users.models import User
 
 
+class QuotaExceeded(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f'Resources quota is exceeded. Current limit is {limit}.')
+        self.limit = limit
+
+
+class UserQuotaQuerySet(models.QuerySet):
+    def reserve(self, user_id: int, count: int = 1) -> bool:
+        """
+        Increments used counter if it does not exceed the limit, in a single conditional UPDATE.
+        """
+        return bool(
+            self.filter(user_id=user_id)
+                .filter(Q(limit__isnull=True) | Q(used__lte=F('limit') - count))
+                .update(used=F('used') + count, updated_at=Now())
+        )
+
+    def reserve_available(self, user_id: int, count: int) -> int:
+        """
+        Increments used counter by as many as the limit allows and returns reserved count.
+        """
+        quota = self.select_for_update().get(user_id=user_id)
+        if quota.limit is not None:
+            count = min(count, max(quota.limit - quota.used, 0))
+        if count:
+            self.filter(user_id=user_id).update(used=F('used') + count, updated_at=Now())
+        return count
+
+    def release(self, user_id: int, count: int = 1) -> None:
+        self.filter(user_id=user_id).update(used=F('used') - count, updated_at=Now())
+
+    def with_utilization(self, live: bool = False) -> 'UserQuotaQuerySet':
+        """
+        Annotates resources count and part of the limit used by them, unlimited quotas have zero utilization.
+        Live count is calculated by one grouped query, otherwise the incrementally maintained used counter is taken.
+        """
+        return self.annotate(
+            resources_count=Count('user__resources') if live else F('used'),
+        ).annotate(
+            utilization=Case(
+                When(limit__isnull=True, then=Value(0.0)),
+                When(limit=0, then=Value(1.0)),
+                default=Cast('resources_count', FloatField()) / F('limit'),
+                output_field=FloatField(),
+            ),
+        )
+
+    def touch(self, user_id: int) -> None:
+        """
+        Updates modification time, which is also used as version of user resources collection.
+        """
+        self.filter(user_id=user_id).update(updated_at=Now())
+
+
 class UserQuota(models.Model):
     user = models.OneToOneField(
         User, primary_key=True, related_name='quota', on_delete=models.CASCADE, null=False, editable=False
     )
     limit = models.PositiveIntegerField(null=True, default=None)
+    used = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserQuotaQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Used counter is changed only by reserve/release, so stale instances must not overwrite it.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name != 'used'
+            ]
+        super().save(*args, **kwargs)
+
+
+class ResourceQuerySet(models.QuerySet):
+    def delete_by_chunks(self, chunk_size: int, on_chunk: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Deletes resources by set-based DELETE queries, each chunk in own transaction, and releases users quotas.
+        Signals are not sent for deleted resources. on_chunk is called with count of deleted resources
+        in transaction of every chunk.
+        """
+        deleted = 0
+        last_pk = 0
+        while True:
+            rows = list(self.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'user_id')[:chunk_size])
+            if not rows:
+                return deleted
+            last_pk = rows[-1][0]
+            pks, user_ids = zip(*rows)
+
+            connection = connections[self.db]
+            with transaction.atomic(using=self.db):
+                with connection.cursor() as cursor:
+                    # Condition on user_id prunes partitions of partitioned table.
+                    cursor.execute(
+                        f'DELETE FROM {connection.ops.quote_name(self.model._meta.db_table)} '
+                        f'WHERE id = ANY(%s) AND user_id = ANY(%s) RETURNING id, user_id, name',
+                        [list(pks), sorted(set(user_ids))]
+                    )
+                    rows = cursor.fetchall()
+                    users_counts = Counter(user_id for _, user_id, _ in rows)
+                # Quotas are locked in the same order by all requests to avoid deadlocks.
+                for user_id in sorted(users_counts):
+                    UserQuota.objects.using(self.db).release(user_id, users_counts[user_id])
+                ResourceChange.objects.using(self.db).log(
+                    ResourceChange.resource_deleted(self.model(pk=pk, user_id=user_id, name=name))
+                    for pk, user_id, name in rows
+                )
+                if on_chunk is not None:
+                    on_chunk(sum(users_counts.values()))
+            deleted += sum(users_counts.values())
 
 
 class Resource(models.Model):
     user = models.ForeignKey(User, on_delete=models.PROTECT, editable=False, null=False, related_name='resources')
     name = models.CharField(max_length=200, null=False, blank=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ResourceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='resource_user_id_idx'),
+            models.Index(fields=['user', 'name'], name='resource_user_name_idx'),
+            # Default operator class cannot serve LIKE 'prefix%' in databases with non-C collation.
+            models.Index(fields=['user', 'name'], name='resource_user_name_pattern_idx',
+                         opclasses=['int4_ops', 'varchar_pattern_ops']),
+            GinIndex(fields=['name'], name='resource_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Quota is reserved by post_save receiver, so the insert is rolled back together with failed reservation.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class ResourceChangeQuerySet(models.QuerySet):
+    def log(self, changes: Iterable['ResourceChange']) -> None:
+        """
+        Inserts changes in current transaction with its id. Transactions are committed not in order of sequence
+        numbers, so the feed is ordered by transaction id and returns changes of finished transactions only.
+        """
+        changes = list(changes)
+        if not changes:
+            return
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute('SELECT txid_current()')
+                txid = cursor.fetchone()[0]
+            for change in changes:
+                change.txid = txid
+            self.bulk_create(changes)
+
+
+class ResourceChange(models.Model):
+    """
+    Log of resources and quotas changes, id is sequence number of the change.
+    """
+    RESOURCE_CREATED = 'resource.created'
+    RESOURCE_DELETED = 'resource.deleted'
+    QUOTA_UPDATED = 'quota.updated'
+    TYPES = (RESOURCE_CREATED, RESOURCE_DELETED, QUOTA_UPDATED)
+
+    id = models.BigAutoField(primary_key=True)
+    # Id of transaction, which logged the change.
+    txid = models.BigIntegerField(editable=False)
+    # Users are deleted with their resources, so the log keeps only their ids.
+    user_id = models.IntegerField()
+    type = models.CharField(max_length=20, choices=[(type, type) for type in TYPES])
+    object_id = models.IntegerField()
+    # Name of created or deleted resource.
+    name = models.CharField(max_length=200, blank=True, default='')
+    # Limit of updated quota.
+    limit = models.PositiveIntegerField(null=True, default=None)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ResourceChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='resource_change_txid_idx'),
+            models.Index(fields=['user_id', 'txid', 'id'], name='resource_change_user_txid_idx'),
+            BrinIndex(fields=['created_at'], name='resource_change_created_idx'),
+        ]
+
+    @classmethod
+    def resource_created(cls, resource: Resource) -> 'ResourceChange':
+        return cls(user_id=resource.user_id, type=cls.RESOURCE_CREATED, object_id=resource.pk, name=resource.name)
+
+    @classmethod
+    def resource_deleted(cls, resource: Resource) -> 'ResourceChange':
+        return cls(user_id=resource.user_id, type=cls.RESOURCE_DELETED, object_id=resource.pk, name=resource.name)
+
+    @classmethod
+    def quota_updated(cls, quota: UserQuota) -> 'ResourceChange':
+        return cls(user_id=quota.user_id, type=cls.QUOTA_UPDATED, object_id=quota.user_id, limit=quota.limit)
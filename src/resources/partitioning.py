@@ -0,0 +1,196 @@
+"""
+Online migration of resources table to table hash-partitioned by user_id, used by partition_resources command.
+Queries of user's resources are pruned to one partition, so partitions are vacuumed and indexed independently.
+
+The partitioned table is created next to the current one, writes to the current table are mirrored to it by trigger
+and existing rows are copied by batches. Then tables are swapped in a short transaction and the old table is kept
+without foreign key for verification.
+"""
+from typing import Callable, List, Optional
+
+from django.db import transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+from users.models import User
+from .models import Resource
+
+TABLE = Resource._meta.db_table
+PARTITIONED = 'partitioned'
+UNPARTITIONED = 'unpartitioned'
+TRIGGER = f'{TABLE}_partitioning'
+# Index names are unique in schema, so indexes of the new table have suffix of the table till the swap.
+INDEXES = {
+    'resource_user_id_idx': '("user_id", "id")',
+    'resource_user_name_idx': '("user_id", "name")',
+    'resource_user_name_pattern_idx': '("user_id", "name" varchar_pattern_ops)',
+    'resource_name_trgm_idx': 'USING gin ("name" gin_trgm_ops)',
+}
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def get_table(suffix: str) -> str:
+    return f'{TABLE}_{suffix}'
+
+
+def _fetch_column(connection: BaseDatabaseWrapper, sql: str, params: Optional[list] = None) -> List:
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def is_partitioned(connection: BaseDatabaseWrapper) -> bool:
+    return _fetch_column(connection, 'SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [TABLE]) == ['p']
+
+
+def get_partitions_count(connection: BaseDatabaseWrapper, table: str) -> int:
+    return len(_fetch_column(connection, 'SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s)', [table]))
+
+
+def _existing_indexes(connection: BaseDatabaseWrapper, table: str) -> List[str]:
+    return _fetch_column(connection, 'SELECT indexname FROM pg_indexes WHERE tablename = %s', [table])
+
+
+def prepare(connection: BaseDatabaseWrapper, partitions: int) -> None:
+    """
+    Creates partitioned table with indexes of the current table and trigger, which mirrors writes to it.
+    Prepared table is reused, if it has the same count of partitions.
+    """
+    if connection.pg_version < 110000:
+        raise PartitioningError('Hash partitioning with foreign keys requires PostgreSQL 11 or newer.')
+    if is_partitioned(connection):
+        raise PartitioningError(f'Table {TABLE} is already partitioned.')
+    table = get_table(PARTITIONED)
+    existing = get_partitions_count(connection, table)
+    if existing and existing != partitions:
+        raise PartitioningError(f'Table {table} is already prepared with {existing} partitions.')
+
+    quote = connection.ops.quote_name
+    user_table = User._meta.db_table
+    indexes = _existing_indexes(connection, TABLE)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Primary key of partitioned table must include partition key, id is still unique by the sequence.
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {quote(table)} ('
+            f'LIKE {quote(TABLE)} INCLUDING DEFAULTS, '
+            f'CONSTRAINT {quote(f"{table}_pkey")} PRIMARY KEY ("id", "user_id"), '
+            f'CONSTRAINT {quote(f"{table}_user_id_fk")} FOREIGN KEY ("user_id") '
+            f'REFERENCES {quote(user_table)} ("id") DEFERRABLE INITIALLY DEFERRED'
+            f') PARTITION BY HASH ("user_id")'
+        )
+        for remainder in range(partitions):
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {quote(f"{TABLE}_p{remainder}")} PARTITION OF {quote(table)} '
+                f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+            )
+        for name, definition in INDEXES.items():
+            # Trigram index exists only if pg_trgm extension is available.
+            if name in indexes:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {quote(f"{name}_{PARTITIONED}")} '
+                               f'ON {quote(table)} {definition}')
+
+        # Row is locked by copying batch, so the copied version is deleted on concurrent update or deletion.
+        cursor.execute(f'''
+            CREATE OR REPLACE FUNCTION {quote(TRIGGER)}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {quote(table)} WHERE "id" = OLD."id" AND "user_id" = OLD."user_id";
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {quote(table)} VALUES (NEW.*);
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute(f'DROP TRIGGER IF EXISTS {quote(TRIGGER)} ON {quote(TABLE)}')
+        cursor.execute(
+            f'CREATE TRIGGER {quote(TRIGGER)} AFTER INSERT OR UPDATE OR DELETE ON {quote(TABLE)} '
+            f'FOR EACH ROW EXECUTE PROCEDURE {quote(TRIGGER)}()'
+        )
+
+
+def copy_rows(
+        connection: BaseDatabaseWrapper, batch_size: int, start_id: int = 0,
+        on_batch: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    Copies rows of the current table to the partitioned one by batches ordered by id, each batch in own transaction.
+    Rows mirrored by trigger are skipped. on_batch is called with count of rows and the last id of every batch,
+    which is start_id to resume copying.
+    """
+    quote = connection.ops.quote_name
+    copied = 0
+    last_id = start_id
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH batch AS ('
+                f'SELECT * FROM {quote(TABLE)} WHERE "id" > %s ORDER BY "id" LIMIT %s FOR UPDATE'
+                f'), copied AS ('
+                f'INSERT INTO {quote(get_table(PARTITIONED))} SELECT * FROM batch ON CONFLICT DO NOTHING'
+                f') SELECT count(*), max("id") FROM batch',
+                [last_id, batch_size]
+            )
+            count, max_id = cursor.fetchone()
+        if not count:
+            break
+        copied += count
+        last_id = max_id
+        if on_batch is not None:
+            on_batch(count, last_id)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {quote(get_table(PARTITIONED))}')
+    return copied
+
+
+def swap(connection: BaseDatabaseWrapper, replacement: str = PARTITIONED, kept: str = UNPARTITIONED,
+         lock_timeout: float = 5) -> None:
+    """
+    Replaces the current table by the table with replacement suffix, the current one is renamed with kept suffix.
+    The current table is locked exclusively only for renames, lock is not awaited longer than lock_timeout seconds.
+    """
+    quote = connection.ops.quote_name
+    kept_table = get_table(kept)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout * 1000)}ms'")
+        cursor.execute(f'LOCK TABLE {quote(TABLE)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+        indexes = _existing_indexes(connection, TABLE)
+        constraints = _fetch_column(
+            connection, "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'f')",
+            [TABLE]
+        )
+
+        cursor.execute(f'DROP TRIGGER IF EXISTS {quote(TRIGGER)} ON {quote(TABLE)}')
+        cursor.execute(f'DROP FUNCTION IF EXISTS {quote(TRIGGER)}()')
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} RENAME TO {quote(kept_table)}')
+        for name in constraints:
+            if name == f'{TABLE}_pkey':
+                cursor.execute(f'ALTER TABLE {quote(kept_table)} RENAME CONSTRAINT {quote(name)} '
+                               f'TO {quote(f"{kept_table}_pkey")}')
+            else:
+                # Kept rows of deleted resources must not protect users from deletion.
+                cursor.execute(f'ALTER TABLE {quote(kept_table)} DROP CONSTRAINT {quote(name)}')
+        for name in INDEXES:
+            if name in indexes:
+                cursor.execute(f'ALTER INDEX {quote(name)} RENAME TO {quote(f"{name}_{kept}")}')
+        cursor.execute(f'ALTER TABLE {quote(kept_table)} ALTER COLUMN "id" DROP DEFAULT')
+
+        replacement_table = get_table(replacement)
+        cursor.execute(f'ALTER TABLE {quote(replacement_table)} RENAME TO {quote(TABLE)}')
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} ALTER COLUMN "id" SET DEFAULT nextval(%s::regclass)', [sequence])
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote(TABLE)}."id"')
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} RENAME CONSTRAINT {quote(f"{replacement_table}_pkey")} '
+                       f'TO {quote(f"{TABLE}_pkey")}')
+        for name in INDEXES:
+            cursor.execute(f'ALTER INDEX IF EXISTS {quote(f"{name}_{replacement}")} RENAME TO {quote(name)}')
+
+
+def drop_table(connection: BaseDatabaseWrapper, suffix: str) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(get_table(suffix))}')
@@ -1,38 +1,118 @@
-from typing import Dict, Any, Optional
+from collections import defaultdict
+from typing import Dict, Any, Optional, List
 
+from django.conf import settings
 from django.db import transaction
 from django.utils.functional import cached_property
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.settings import api_settings
 
 from users.models import User
-from .models import UserQuota, Resource
+from .models import UserQuota, Resource, ResourceChange, QuotaExceeded
 
 
 class UserQuotaSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserQuota
-        fields = ('user_id', 'limit')
+        fields = ('user_id', 'limit', 'used')
+        read_only_fields = ('used',)
 
-    def _validate_limit(self, limit: Optional[int], user: User):
-        UserQuota.objects.select_for_update().get(user=user)
+    def _validate_limit(self, limit: Optional[int], instance: UserQuota):
+        instance.used = UserQuota.objects.select_for_update().values_list('used', flat=True).get(pk=instance.pk)
         if limit is None:
             return
 
-        user_resources_count = user.resources.count()
-        if user_resources_count > limit:
+        if instance.used > limit:
             raise serializers.ValidationError({'limit': [f'Cannot be less than current resources count. '
-                                                         f'Current resources count is {user_resources_count}.']})
+                                                         f'Current resources count is {instance.used}.']})
 
     @transaction.atomic()
     def update(self, instance: UserQuota, validated_data: Dict[str, Any]) -> UserQuota:
         if 'limit' in validated_data:
-            self._validate_limit(validated_data['limit'], instance.user)
+            self._validate_limit(validated_data['limit'], instance)
         return super().update(instance, validated_data)
 
 
+class UserQuotaUtilizationSerializer(serializers.ModelSerializer):
+    resources_count = serializers.IntegerField()
+    utilization = serializers.FloatField()
+
+    class Meta:
+        model = UserQuota
+        fields = ('user_id', 'limit', 'resources_count', 'utilization')
+
+
+class ResourceUserField(serializers.PrimaryKeyRelatedField):
+    """
+    Uses users prefetched by ResourceListSerializer instead of querying them one by one.
+    """
+
+    def to_internal_value(self, data: Any) -> User:
+        users = getattr(self.root, 'users', None)
+        if users is None or isinstance(data, bool):
+            return super().to_internal_value(data)
+        try:
+            return users[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ResourceListSerializer(serializers.ListSerializer):
+    @cached_property
+    def allow_partial(self) -> bool:
+        return self.context['request'].query_params.get('allow_partial', '').lower() in ('1', 'true')
+
+    def to_internal_value(self, data: Any) -> List[Dict[str, Any]]:
+        # Size is checked before users are loaded and items are validated.
+        if isinstance(data, list) and len(data) > settings.RESOURCES_BATCH_MAX_SIZE:
+            message = f'Ensure this list has no more than {settings.RESOURCES_BATCH_MAX_SIZE} elements.'
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='max_length')
+        if isinstance(data, list):
+            user_ids = {str(item['user_id']) for item in data if isinstance(item, dict) and 'user_id' in item}
+            self.users = User.objects.in_bulk([int(user_id) for user_id in user_ids if user_id.isdigit()])
+        return super().to_internal_value(data)
+
+    def _reserve(self, user_id: int, count: int) -> int:
+        if self.allow_partial:
+            return UserQuota.objects.reserve_available(user_id, count)
+        if not UserQuota.objects.reserve(user_id, count):
+            limit = UserQuota.objects.values_list('limit', flat=True).get(user_id=user_id)
+            raise PermissionDenied(f'Resources quota is exceeded for user {user_id}. Current limit is {limit}.')
+        return count
+
+    @transaction.atomic()
+    def create(self, validated_data: List[Dict[str, Any]]) -> List[Optional[Resource]]:
+        """
+        Reserves quota once per user and inserts resources by one query.
+        Resources which are not fitted to quota in partial mode are returned as None.
+        """
+        positions_by_user = defaultdict(list)
+        for position, attrs in enumerate(validated_data):
+            positions_by_user[attrs['user'].pk].append(position)
+
+        resources = [None] * len(validated_data)
+        # Quotas are locked in the same order by all requests to avoid deadlocks.
+        for user_id in sorted(positions_by_user):
+            positions = positions_by_user[user_id]
+            reserved = self._reserve(user_id, len(positions))
+            for position in positions[:reserved]:
+                resources[position] = Resource(**validated_data[position])
+
+        created = Resource.objects.bulk_create([resource for resource in resources if resource is not None])
+        ResourceChange.objects.log(map(ResourceChange.resource_created, created))
+        return resources
+
+    def to_representation(self, data: List[Optional[Resource]]) -> List[Optional[Dict[str, Any]]]:
+        if not isinstance(data, list):
+            return super().to_representation(data)
+        return [None if item is None else self.child.to_representation(item) for item in data]
+
+
 class ResourceSerializer(serializers.ModelSerializer):
-    user_id = serializers.PrimaryKeyRelatedField(
+    user_id = ResourceUserField(
         source='user',
         queryset=User.objects.all(),
         default=serializers.CreateOnlyDefault(serializers.CurrentUserDefault()),
@@ -45,16 +125,53 @@ class ResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Resource
         fields = ('id', 'user_id', 'name')
+        list_serializer_class = ResourceListSerializer
 
     def validate_user_id(self, user: User) -> User:
         if self.request_user.is_staff:
             return user
         return self.request_user
 
-    @transaction.atomic()
     def create(self, validated_data: Dict[str, Any]) -> Resource:
-        user = validated_data['user']
-        quota = UserQuota.objects.select_for_update().get(user=user)
-        if quota.limit is not None and user.resources.count() >= quota.limit:
-            raise PermissionDenied(f'Resources quota is exceeded. Current limit is {quota.limit}.')
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except QuotaExceeded as e:
+            raise PermissionDenied(str(e))
+
+
+class DeletedCountSerializer(serializers.Serializer):
+    """
+    Serializer for bulk delete response, used in schema views.
+    """
+    deleted = serializers.IntegerField()
+
+
+class ResourceChangeSerializer(serializers.ModelSerializer):
+    seq = serializers.IntegerField(source='id')
+
+    class Meta:
+        model = ResourceChange
+        fields = ('seq', 'type', 'user_id', 'object_id', 'name', 'limit', 'created_at')
+
+
+class ResourceChangesSerializer(serializers.Serializer):
+    seq = serializers.IntegerField(help_text='Sequence number of the last change, since parameter of next request.')
+    changes = ResourceChangeSerializer(many=True)
+
+
+class ResourceChangesParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of changes feed, used in schema views.
+    """
+    since = serializers.IntegerField(
+        required=False, min_value=0,
+        help_text='Changes after this sequence number are returned. Without it only sequence number of the last change '
+                  'is returned, which is the start of the feed. Last-Event-ID header is used in SSE mode.',
+    )
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=settings.FEED_MAX_BATCH_SIZE, default=settings.FEED_BATCH_SIZE,
+    )
+    wait = serializers.FloatField(
+        required=False, min_value=0, max_value=settings.FEED_MAX_WAIT, default=0,
+        help_text='Seconds to wait for changes, if there are no changes yet.',
+    )
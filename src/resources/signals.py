@@ -1,11 +1,33 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from users.models import User
-from .models import UserQuota
+from .models import UserQuota, Resource, ResourceChange, QuotaExceeded
 
 
 @receiver(post_save, sender=User, dispatch_uid="add_user_quota_by_user_created")
 def user_saved(sender, instance: User, created: bool, **kwargs):
     if created:
         UserQuota.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Resource, dispatch_uid="reserve_user_quota_by_resource_created")
+def resource_saved(sender, instance: Resource, created: bool, **kwargs):
+    if not created:
+        UserQuota.objects.touch(instance.user_id)
+    elif not UserQuota.objects.reserve(instance.user_id):
+        raise QuotaExceeded(UserQuota.objects.values_list('limit', flat=True).get(user_id=instance.user_id))
+    else:
+        ResourceChange.objects.log([ResourceChange.resource_created(instance)])
+
+
+@receiver(post_delete, sender=Resource, dispatch_uid="release_user_quota_by_resource_deleted")
+def resource_deleted(sender, instance: Resource, **kwargs):
+    UserQuota.objects.release(instance.user_id)
+    ResourceChange.objects.log([ResourceChange.resource_deleted(instance)])
+
+
+@receiver(post_save, sender=UserQuota, dispatch_uid="log_user_quota_updated")
+def user_quota_saved(sender, instance: UserQuota, created: bool, **kwargs):
+    if not created:
+        ResourceChange.objects.log([ResourceChange.quota_updated(instance)])
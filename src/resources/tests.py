@@ -1,9 +1,23 @@
+import json
+import re
+import threading
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import ProtectedError
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.reverse import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 
 from users.test_utils import UserClientMixin, random_string
-from .models import Resource, UserQuota
+from .feed import stream_slots
+from .models import Resource, ResourceChange, UserQuota
+from .partitioning import PARTITIONED, UNPARTITIONED, drop_table, is_partitioned, swap
 
 
 class QuotaTests(UserClientMixin, APITestCase):
@@ -50,6 +64,16 @@ class QuotaTests(UserClientMixin, APITestCase):
         response = self.user_client.put(self.get_quota_path(self.user.pk), dict(limit=limit))
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_get_quota_not_modified(self):
+        response = self.admin_client.get(self.get_quota_path(self.user.pk))
+        etag = response['ETag']
+        Resource.objects.create(user=self.user, name=random_string())
+        response = self.admin_client.get(self.get_quota_path(self.user.pk), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['used'], 1)
+        response = self.admin_client.get(self.get_quota_path(self.user.pk), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_put_quota_admin(self):
         limit = 2
         response = self.admin_client.put(self.get_quota_path(self.user.pk), dict(limit=limit))
@@ -75,6 +99,62 @@ class QuotaTests(UserClientMixin, APITestCase):
         response = self.admin_client.put(self.get_quota_path(user.pk), dict(limit=1))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_used_quota_on_resources_created_and_deleted(self):
+        user = self.random_user()
+        resource = Resource.objects.create(user=user, name=random_string())
+        Resource.objects.create(user=user, name=random_string())
+        self.assertEqual(UserQuota.objects.get(user=user).used, 2)
+        resource.delete()
+        self.assertEqual(UserQuota.objects.get(user=user).used, 1)
+
+    def test_put_quota_does_not_change_used(self):
+        user = self.random_user()
+        Resource.objects.create(user=user, name=random_string())
+        response = self.admin_client.put(self.get_quota_path(user.pk), dict(limit=2, used=0))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['used'], 1)
+        self.assertEqual(UserQuota.objects.get(user=user).used, 1)
+
+    def test_sync_quota_usage(self):
+        user = self.random_user()
+        Resource.objects.create(user=user, name=random_string())
+        UserQuota.objects.filter(user=user).update(used=5)
+        call_command('sync_quota_usage', stdout=StringIO())
+        self.assertEqual(UserQuota.objects.get(user=user).used, 1)
+
+    def test_quotas_utilization_report(self):
+        UserQuota.objects.update(limit=None)
+        user = self.random_user()
+        UserQuota.objects.filter(user=user).update(limit=4)
+        for _ in range(3):
+            Resource.objects.create(user=user, name=random_string())
+        empty_user = self.random_user()
+        UserQuota.objects.filter(user=empty_user).update(limit=0)
+        path = reverse('users-quota-utilization')
+        self.assertEqual(self.user_client.get(path).status_code, status.HTTP_403_FORBIDDEN)
+        for source in ('counter', 'live'):
+            response = self.admin_client.get(path, data=dict(source=source, min_utilization=0.5,
+                                                             ordering='-utilization'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json(), [
+                dict(user_id=empty_user.pk, limit=0, resources_count=0, utilization=1.0),
+                dict(user_id=user.pk, limit=4, resources_count=3, utilization=0.75),
+            ])
+        response = self.admin_client.get(path, data=dict(source='unknown'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_quotas_utilization_report_csv(self):
+        user = self.random_user()
+        UserQuota.objects.filter(user=user).update(limit=2)
+        Resource.objects.create(user=user, name=random_string())
+        response = self.admin_client.get(reverse('users-quota-utilization'),
+                                         data=dict(format='csv', min_utilization=0.5, source='live'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'user_id,limit,resources_count,utilization', f'{user.pk},2,1,0.5',
+        ])
+
 
 class ResourcesTests(UserClientMixin, APITestCase):
     @property
@@ -109,6 +189,117 @@ class ResourcesTests(UserClientMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()), Resource.objects.filter(user=self.user).count())
 
+    def test_list_resources_filtered_by_name(self):
+        for name in ('alpha', 'alphabet', 'beta', 'gamma alpha'):
+            Resource.objects.create(user=self.user, name=name)
+        for params, names in (
+            (dict(name='alpha'), ['alpha']),
+            (dict(name__startswith='alpha'), ['alpha', 'alphabet']),
+            (dict(name__contains='alpha'), ['alpha', 'alphabet', 'gamma alpha']),
+        ):
+            response = self.user_client.get(self.resources_path, data=params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([item['name'] for item in response.json()], names)
+
+    def test_list_resources_ordered_by_name(self):
+        for name in ('b', 'a', 'b', 'c'):
+            Resource.objects.create(user=self.user, name=name)
+        response = self.user_client.get(self.resources_path, data=dict(ordering='-name'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.json()], ['c', 'b', 'b', 'a'])
+        ids = [item['id'] for item in response.json()]
+        self.assertLess(ids[1], ids[2])
+
+    def test_list_resources_cursor_ordered_by_name(self):
+        for name in ('b', 'a', 'b', 'c', 'b'):
+            Resource.objects.create(user=self.user, name=name)
+        ids = []
+        response = self.user_client.get(self.resources_path, data=dict(ordering='name', cursor='', limit=2))
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.json()['results'])
+            if response.json()['next'] is None:
+                break
+            response = self.user_client.get(response.json()['next'])
+        self.assertEqual(ids, list(Resource.objects.order_by('name', 'pk').values_list('pk', flat=True)))
+
+    def test_list_resources_limit_offset(self):
+        resources = [Resource.objects.create(user=self.user, name=random_string()) for _ in range(3)]
+        response = self.user_client.get(self.resources_path, data=dict(limit=2, offset=1))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 3)
+        self.assertEqual(response.json()['count_type'], 'exact')
+        self.assertEqual([item['id'] for item in response.json()['results']], [r.pk for r in resources[1:]])
+
+    def test_list_resources_auto_count_is_one_query(self):
+        Resource.objects.create(user=self.user, name=random_string())
+        with CaptureQueriesContext(connection) as context:
+            response = self.user_client.get(self.resources_path, data=dict(limit=2))
+        self.assertEqual(response.json()['count_type'], 'exact')
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(sum('COUNT(*)' in sql for sql in queries), 1)
+        self.assertFalse(any(sql.startswith('EXPLAIN') for sql in queries))
+
+    def test_list_resources_count_types(self):
+        for _ in range(3):
+            Resource.objects.create(user=self.user, name=random_string())
+        for count_type in ('auto', 'cached', 'estimated', 'none'):
+            response = self.user_client.get(self.resources_path, data=dict(limit=2, count=count_type))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.json()['results']), 2)
+            self.assertIsNotNone(response.json()['next'])
+        response = self.user_client.get(self.resources_path, data=dict(limit=2, count='none'))
+        self.assertEqual(response.json()['count'], None)
+        self.assertEqual(response.json()['count_type'], 'none')
+        response = self.user_client.get(self.resources_path, data=dict(limit=2, count='cached'))
+        self.assertEqual(response.json()['count'], 3)
+        self.assertEqual(response.json()['count_type'], 'cached')
+        response = self.user_client.get(self.resources_path, data=dict(limit=2, count='estimated'))
+        self.assertEqual(response.json()['count_type'], 'estimated')
+        response = self.admin_client.get(self.resources_path, data=dict(limit=2, count='estimated'))
+        self.assertEqual(response.json()['count_type'], 'estimated')
+        response = self.user_client.get(self.resources_path, data=dict(limit=2, count='unknown'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_resources_cursor(self):
+        resources = [Resource.objects.create(user=self.user, name=random_string()) for _ in range(5)]
+        ids = []
+        response = self.admin_client.get(self.resources_path, data=dict(user_id=self.user.pk, cursor='', limit=2))
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.json()['results'])
+            if response.json()['next'] is None:
+                break
+            response = self.admin_client.get(response.json()['next'])
+        self.assertEqual(ids, [r.pk for r in resources])
+
+    def test_get_resource_not_modified(self):
+        resource = Resource.objects.create(user=self.user, name=random_string())
+        response = self.user_client.get(self.get_resource_path(resource.pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        response = self.user_client.get(self.get_resource_path(resource.pk), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        resource.name = random_string()
+        resource.save()
+        response = self.user_client.get(self.get_resource_path(resource.pk), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['name'], resource.name)
+
+    def test_list_resources_not_modified(self):
+        Resource.objects.create(user=self.user, name=random_string())
+        response = self.user_client.get(self.resources_path)
+        etag = response['ETag']
+        response = self.user_client.get(self.resources_path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.admin_client.get(self.resources_path, data=dict(user_id=self.user.pk), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        Resource.objects.create(user=self.user, name=random_string())
+        response = self.user_client.get(self.resources_path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 2)
+
     def test_create_resource_user(self):
         name = random_string()
         response = self.user_client.post(self.resources_path, dict(name=name))
@@ -149,6 +340,69 @@ class ResourcesTests(UserClientMixin, APITestCase):
         response = self.admin_client.post(self.resources_path, dict(name=random_string(), user_id=self.user.pk))
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_create_resource_if_limit_is_reached(self):
+        self.user.quota.limit = 1
+        self.user.quota.save()
+        response = self.user_client.post(self.resources_path, dict(name=random_string()))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.user_client.post(self.resources_path, dict(name=random_string()))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Resource.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(UserQuota.objects.get(user=self.user).used, 1)
+
+    def test_batch_create_resources_user(self):
+        names = [random_string() for _ in range(3)]
+        response = self.user_client.post(self.resources_path, [dict(name=name) for name in names], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['name'] for item in response.json()], names)
+        self.assertEqual([item['id'] for item in response.json()],
+                         list(Resource.objects.filter(user=self.user).order_by('id').values_list('id', flat=True)))
+        self.assertEqual(UserQuota.objects.get(user=self.user).used, 3)
+
+    def test_batch_create_resources_admin_for_many_users(self):
+        user = self.random_user()
+        data = [dict(name=random_string(), user_id=user.pk), dict(name=random_string(), user_id=self.user.pk),
+                dict(name=random_string(), user_id=user.pk)]
+        response = self.admin_client.post(self.resources_path, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['user_id'] for item in response.json()], [user.pk, self.user.pk, user.pk])
+        self.assertEqual(UserQuota.objects.get(user=user).used, 2)
+        self.assertEqual(UserQuota.objects.get(user=self.user).used, 1)
+
+    def test_batch_create_resources_for_unknown_user(self):
+        data = [dict(name=random_string(), user_id=0)]
+        response = self.admin_client.post(self.resources_path, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_create_resources_if_limit_is_exceeded(self):
+        self.user.quota.limit = 2
+        self.user.quota.save()
+        data = [dict(name=random_string()) for _ in range(3)]
+        response = self.user_client.post(self.resources_path, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Resource.objects.filter(user=self.user).exists())
+        self.assertEqual(UserQuota.objects.get(user=self.user).used, 0)
+
+    @override_settings(RESOURCES_BATCH_MAX_SIZE=2)
+    def test_batch_create_resources_if_batch_is_too_large(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.admin_client.post(self.resources_path, [
+                {'name': random_string(), 'user_id': self.user.pk} for _ in range(3)
+            ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', response.json())
+        self.assertFalse(any('"users_user"."id" IN' in query['sql'] for query in context.captured_queries))
+
+    def test_batch_create_resources_partial_if_limit_is_exceeded(self):
+        self.user.quota.limit = 2
+        self.user.quota.save()
+        data = [dict(name=random_string()) for _ in range(3)]
+        response = self.user_client.post(f'{self.resources_path}?allow_partial=true', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item and item['name'] for item in response.json()], [data[0]['name'], data[1]['name'], None])
+        self.assertEqual(Resource.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(UserQuota.objects.get(user=self.user).used, 2)
+
     def test_get_resource_user(self):
         name = random_string()
         resource = Resource.objects.create(user=self.user, name=name)
@@ -188,3 +442,227 @@ class ResourcesTests(UserClientMixin, APITestCase):
         resource = Resource.objects.create(user=self.random_user(), name=random_string())
         response = self.user_client.delete(self.get_resource_path(resource.pk))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_resources_user(self):
+        resources = [Resource.objects.create(user=self.user, name=random_string()) for _ in range(3)]
+        Resource.objects.create(user=self.admin, name=random_string())
+        with self.settings(STREAMING_CHUNK_SIZE=2):
+            response = self.user_client.get(reverse('resources-export'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [dict(id=r.pk, user_id=self.user.pk, name=r.name) for r in resources])
+
+    def test_export_filtered_resources_admin_csv(self):
+        resource = Resource.objects.create(user=self.user, name='a,b')
+        Resource.objects.create(user=self.admin, name=random_string())
+        response = self.admin_client.get(reverse('resources-export'), data=dict(user_id=self.user.pk, format='csv'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="resources.csv"')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(),
+                         ['id,user_id,name', f'{resource.pk},{self.user.pk},"a,b"'])
+
+    def test_bulk_delete_resources_without_filters(self):
+        Resource.objects.create(user=self.user, name=random_string())
+        response = self.admin_client.delete(self.resources_path)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Resource.objects.filter(user=self.user).exists())
+
+    def test_bulk_delete_resources_with_empty_filters(self):
+        Resource.objects.create(user=self.user, name=random_string())
+        Resource.objects.create(user=self.admin, name=random_string())
+        for query in ('user_id=', 'id__in=', 'user_id=&name='):
+            response = self.admin_client.delete(f'{self.resources_path}?{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.admin_client.delete(f'{self.resources_path}?user_id=abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Resource.objects.count(), 2)
+
+    def test_bulk_delete_resources_user(self):
+        another_resource = Resource.objects.create(user=self.admin, name=random_string())
+        resources = [Resource.objects.create(user=self.user, name=random_string()) for _ in range(3)]
+        ids = ','.join(str(resource.pk) for resource in resources[:2] + [another_resource])
+        response = self.user_client.delete(f'{self.resources_path}?id__in={ids}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'deleted': 2})
+        self.assertEqual(list(Resource.objects.filter(user=self.user)), resources[2:])
+        self.assertTrue(Resource.objects.filter(pk=another_resource.pk).exists())
+        self.assertEqual(UserQuota.objects.get(user=self.user).used, 1)
+
+    def test_bulk_delete_resources_admin(self):
+        with self.settings(RESOURCES_DELETE_CHUNK_SIZE=2):
+            for _ in range(5):
+                Resource.objects.create(user=self.user, name=random_string())
+            Resource.objects.create(user=self.admin, name=random_string())
+            response = self.admin_client.delete(f'{self.resources_path}?user_id={self.user.pk}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'deleted': 5})
+        self.assertFalse(Resource.objects.filter(user=self.user).exists())
+        self.assertTrue(Resource.objects.filter(user=self.admin).exists())
+        self.assertEqual(UserQuota.objects.get(user=self.user).used, 0)
+
+
+@override_settings(FEED_POLL_INTERVAL=0.01, FEED_HEARTBEAT_INTERVAL=0.05, FEED_STREAM_TIMEOUT=0.1)
+class ResourceChangesTests(UserClientMixin, APITransactionTestCase):
+    # Safe requests out of transaction are read from replicas, if they are configured.
+    databases = '__all__'
+
+    @property
+    def changes_path(self):
+        return reverse('resource-changes')
+
+    def get_head(self, client):
+        response = client.get(self.changes_path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['changes'], [])
+        return response.json()['seq']
+
+    def test_changes(self):
+        since = self.get_head(self.user_client)
+        resource = self.user_client.post(reverse('resources'), {'name': 'first'}).json()
+        self.user_client.post(reverse('resources'), [{'name': 'second'}, {'name': 'third'}], format='json')
+        self.admin_client.post(reverse('resources'), {'name': 'admin'})
+        self.user_client.delete(reverse('resource', kwargs=dict(pk=resource['id'])))
+        self.user_client.delete(f"{reverse('resources')}?name=second")
+        self.admin_client.patch(reverse('user-quota', kwargs=dict(pk=self.user.pk)), {'limit': 10})
+
+        response = self.user_client.get(self.changes_path, {'since': since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        changes = response.json()['changes']
+        self.assertEqual([(change['type'], change['name']) for change in changes], [
+            (ResourceChange.RESOURCE_CREATED, 'first'),
+            (ResourceChange.RESOURCE_CREATED, 'second'),
+            (ResourceChange.RESOURCE_CREATED, 'third'),
+            (ResourceChange.RESOURCE_DELETED, 'first'),
+            (ResourceChange.RESOURCE_DELETED, 'second'),
+            (ResourceChange.QUOTA_UPDATED, ''),
+        ])
+        self.assertEqual(changes[-1]['limit'], 10)
+        self.assertEqual(response.json()['seq'], changes[-1]['seq'])
+
+        response = self.user_client.get(self.changes_path, {'since': changes[1]['seq'], 'limit': 2})
+        self.assertEqual([change['seq'] for change in response.json()['changes']],
+                         [change['seq'] for change in changes[2:4]])
+
+        response = self.admin_client.get(self.changes_path, {'since': since})
+        self.assertEqual(len(response.json()['changes']), len(changes) + 1)
+
+    def test_long_polling(self):
+        since = self.get_head(self.user_client)
+        response = self.user_client.get(self.changes_path, {'since': since, 'wait': 0.05})
+        self.assertEqual(response.json(), {'seq': since, 'changes': []})
+        response = self.user_client.get(self.changes_path, {'since': since, 'wait': 3600})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_server_sent_events(self):
+        since = self.get_head(self.user_client)
+        resource = Resource.objects.create(user=self.user, name=random_string())
+        response = self.user_client.get(self.changes_path, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content).decode()
+        seq = ResourceChange.objects.get(type=ResourceChange.RESOURCE_CREATED, object_id=resource.pk).pk
+        self.assertIn(f'id: {seq}\nevent: resource.created\ndata: {{"seq":{seq},', content)
+        self.assertIn(': heartbeat', content)
+
+    @override_settings(FEED_MAX_STREAMS=1)
+    def test_streams_are_limited(self):
+        since = self.get_head(self.user_client)
+        first = self.user_client.get(self.changes_path, {'since': since}, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        response = self.user_client.get(self.changes_path, {'since': since}, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], str(settings.FEED_MAX_WAIT))
+        b''.join(first.streaming_content)
+        response = self.user_client.get(self.changes_path, {'since': since}, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        b''.join(response.streaming_content)
+
+    def test_polls_are_limited(self):
+        since = self.get_head(self.user_client)
+        for _ in range(settings.FEED_MAX_STREAMS):
+            self.assertTrue(stream_slots.acquire(settings.FEED_MAX_STREAMS))
+        try:
+            started = time.monotonic()
+            response = self.user_client.get(self.changes_path, {'since': since, 'wait': 5})
+            self.assertLess(time.monotonic() - started, 1)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()['changes'], [])
+        finally:
+            for _ in range(settings.FEED_MAX_STREAMS):
+                stream_slots.release()
+        self.user_client.get(self.changes_path, {'since': since, 'wait': 0.05})
+        self.assertEqual(stream_slots.active, 0)
+
+    def test_changes_of_running_transaction_are_not_skipped(self):
+        since = self.get_head(self.admin_client)
+        started, commit = threading.Event(), threading.Event()
+
+        def create_in_transaction():
+            with transaction.atomic():
+                Resource.objects.create(user=self.user, name='long')
+                started.set()
+                commit.wait(5)
+            connection.close()
+
+        thread = threading.Thread(target=create_in_transaction)
+        thread.start()
+        started.wait(5)
+        Resource.objects.create(user=self.admin, name='short')
+        # Change of the committed transaction is returned after change of the older running one.
+        response = self.admin_client.get(self.changes_path, {'since': since})
+        self.assertEqual(response.json()['changes'], [])
+        commit.set()
+        thread.join()
+        response = self.admin_client.get(self.changes_path, {'since': since})
+        self.assertEqual([change['name'] for change in response.json()['changes']], ['long', 'short'])
+
+    def test_pruned_changes(self):
+        Resource.objects.create(user=self.user, name=random_string())
+        since = self.get_head(self.user_client)
+        for _ in range(3):
+            Resource.objects.create(user=self.user, name=random_string())
+        call_command('prune_resource_changes', '--days', '0', stdout=StringIO())
+        self.assertEqual(ResourceChange.objects.count(), 1)
+        response = self.user_client.get(self.changes_path, {'since': since})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        response = self.user_client.get(self.changes_path, {'since': self.get_head(self.user_client)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PartitioningTests(UserClientMixin, APITransactionTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        for user in (self.user, self.admin):
+            for number in range(3):
+                Resource.objects.create(user=user, name=f'resource-{number}')
+
+    def tearDown(self) -> None:
+        # The old table is restored by reverse swap for other tests.
+        if is_partitioned(connection):
+            swap(connection, replacement=UNPARTITIONED, kept=PARTITIONED)
+        drop_table(connection, PARTITIONED)
+        super().tearDown()
+
+    def test_partition_resources(self):
+        call_command('partition_resources', '--no-swap', '--partitions', '4', '--batch-size', '2', stdout=StringIO())
+        self.assertFalse(is_partitioned(connection))
+        # Writes during copying are mirrored to the partitioned table.
+        Resource.objects.create(user=self.user, name='created')
+        Resource.objects.filter(user=self.admin, name='resource-0').delete()
+        Resource.objects.filter(user=self.user, name='resource-1').update(name='updated')
+        resources = list(Resource.objects.order_by('pk').values_list('pk', 'user_id', 'name'))
+
+        call_command('partition_resources', '--partitions', '4', '--batch-size', '2', stdout=StringIO())
+        self.assertTrue(is_partitioned(connection))
+        self.assertEqual(list(Resource.objects.order_by('pk').values_list('pk', 'user_id', 'name')), resources)
+        plan = Resource.objects.filter(user=self.user).explain()
+        self.assertEqual(len(set(re.findall(r' on resources_resource_p\d+', plan))), 1)
+
+        response = self.user_client.post(reverse('resources'), {'name': 'new'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(response.json()['id'], resources[-1][0])
+        response = self.user_client.delete(reverse('resource', kwargs=dict(pk=response.json()['id'])))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(UserQuota.objects.get(user=self.user).used, 4)
+        with self.assertRaises(ProtectedError):
+            self.user.delete()
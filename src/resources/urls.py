@@ -1,15 +1,20 @@
 from django.urls import path
 
-from .views import UserQuotaViewSet, ResourcesViewSet
+from .views import UserQuotaViewSet, UserQuotaUtilizationViewSet, ResourcesViewSet, ResourceChangesViewSet
 
 user_quota_urlpatterns = [
     path(r'', UserQuotaViewSet.as_view({'get': 'list'}), name='users-quota'),
+    path(r'/utilization', UserQuotaUtilizationViewSet.as_view({'get': 'list'}), name='users-quota-utilization'),
     path(r'/<int:pk>', UserQuotaViewSet.as_view({'get': 'retrieve',
                                                  'put': 'update',
                                                  'patch': 'partial_update'}), name='user-quota')
 ]
 
 resources_urlpatterns = [
-    path(r'', ResourcesViewSet.as_view({'post': 'create', 'get': 'list'}), name='resources'),
+    path(r'', ResourcesViewSet.as_view({'post': 'create',
+                                        'get': 'list',
+                                        'delete': 'bulk_destroy'}), name='resources'),
+    path(r'/export', ResourcesViewSet.as_view({'get': 'export'}), name='resources-export'),
+    path(r'/changes', ResourceChangesViewSet.as_view({'get': 'list'}), name='resource-changes'),
     path(r'/<int:pk>', ResourcesViewSet.as_view({'get': 'retrieve', 'delete': 'destroy'}), name='resource')
 ]
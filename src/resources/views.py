@@ -1,23 +1,112 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.db.models import QuerySet
-from rest_framework import mixins
+from django.http import StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import mixins, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.serializers import Serializer, ValidationError
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import GenericViewSet
 
-from .models import UserQuota, Resource
-from .serializers import UserQuotaSerializer, ResourceSerializer
+from simple_resources_api.mixins import (
+    ConditionalGetMixin, ReplicaReadMixin, StreamingExportMixin, ValuesListMixin
+)
+from simple_resources_api.renderers import CSVRenderer, EventStreamRenderer, iter_csv
+from .feed import (
+    LimitedStream, TooManyStreams, get_head, get_position, iter_events, read_changes, stream_slots, wait_changes,
+)
+from .filters import ResourceFilter, StableOrderingFilter, UserQuotaUtilizationFilter
+from .models import UserQuota, Resource, ResourceChange
+from .serializers import (
+    UserQuotaSerializer,
+    UserQuotaUtilizationSerializer,
+    ResourceSerializer,
+    DeletedCountSerializer,
+    ResourceChangeSerializer,
+    ResourceChangesSerializer,
+    ResourceChangesParamsSerializer,
+)
+
+
+def get_user_quota_version(user_id: Any) -> Optional[datetime]:
+    if not str(user_id).isdigit():
+        return None
+    return UserQuota.objects.filter(user_id=user_id).values_list('updated_at', flat=True).first()
 
 
-class UserQuotaViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.ListModelMixin, GenericViewSet):
+class UserQuotaViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    mixins.ListModelMixin,
+    GenericViewSet
+):
     permission_classes = (IsAdminUser,)
     serializer_class = UserQuotaSerializer
-    queryset = UserQuota.objects.all()
+    queryset = UserQuota.objects.order_by('pk')
     lookup_url_kwarg = 'pk'
     lookup_field = 'user_id'
     filterset_fields = ('user_id',)
 
+    def get_list_version(self) -> Optional[datetime]:
+        return get_user_quota_version(self.request.query_params.get('user_id'))
+
+
+class UserQuotaUtilizationViewSet(ReplicaReadMixin, mixins.ListModelMixin, GenericViewSet):
+    """
+    Report of quotas utilization. Resources are counted by the used counter of quotas, or by grouped query
+    with source=live. CSV output is streamed without pagination.
+    """
+    permission_classes = (IsAdminUser,)
+    serializer_class = UserQuotaUtilizationSerializer
+    queryset = UserQuota.objects.all()
+    renderer_classes = (*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer)
+    filter_backends = (DjangoFilterBackend, StableOrderingFilter)
+    filterset_class = UserQuotaUtilizationFilter
+    ordering_fields = ('user_id', 'resources_count', 'utilization')
+    ordering = ('user_id',)
+
+    SOURCES = ('counter', 'live')
+
+    def get_queryset(self) -> QuerySet:
+        source = self.request.query_params.get('source', 'counter')
+        if source not in self.SOURCES:
+            raise ValidationError({'source': [f'Must be one of: {", ".join(self.SOURCES)}.']})
+        return super().get_queryset().with_utilization(live=source == 'live')
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('source', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=SOURCES,
+                          description='Resources are counted by quota counter or by live count.'),
+    ])
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        if request.accepted_renderer.format != CSVRenderer.format:
+            return super().list(request, *args, **kwargs)
+
+        fields = self.get_serializer_class().Meta.fields
+        queryset = self.filter_queryset(self.get_queryset())
+        # Database is chosen now, while replica reads are allowed for the request.
+        rows = queryset.using(queryset.db).values(*fields).iterator(chunk_size=settings.STREAMING_CHUNK_SIZE)
+        response = StreamingHttpResponse(iter_csv(fields, rows), content_type=CSVRenderer.media_type)
+        response['Content-Disposition'] = 'attachment; filename="quotas-utilization.csv"'
+        return response
+
 
 class ResourcesViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    StreamingExportMixin,
+    ValuesListMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
@@ -26,8 +115,22 @@ class ResourcesViewSet(
 ):
     permission_classes = (IsAuthenticated,)
     serializer_class = ResourceSerializer
-    queryset = Resource.objects.all()
-    filterset_fields = ('user_id',)
+    queryset = Resource.objects.order_by('pk')
+    filter_backends = (DjangoFilterBackend, StableOrderingFilter)
+    filterset_class = ResourceFilter
+    ordering_fields = ('id', 'name')
+    ordering = ('id',)
+
+    def get_serializer(self, *args, **kwargs) -> Serializer:
+        if self.action == 'create' and isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def get_list_version(self) -> Optional[datetime]:
+        # Quota modification time is changed with any change of user resources.
+        if not self.request.user.is_staff:
+            return get_user_quota_version(self.request.user.pk)
+        return get_user_quota_version(self.request.query_params.get('user_id'))
 
     def get_queryset(self) -> QuerySet:
         qs = super().get_queryset()
@@ -39,3 +142,83 @@ class ResourcesViewSet(
             return qs.filter(user=self.request.user)
 
         return qs
+
+    @swagger_auto_schema(responses={status.HTTP_200_OK: DeletedCountSerializer()})
+    def bulk_destroy(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        # Empty values are skipped by filters, so they would delete all resources.
+        if not any(value not in (None, '', []) for value in filterset.form.cleaned_data.values()):
+            raise ValidationError({'detail': 'At least one filter is required to delete resources.'})
+        queryset = filterset.qs
+        deleted = queryset.delete_by_chunks(settings.RESOURCES_DELETE_CHUNK_SIZE)
+        return Response(DeletedCountSerializer({'deleted': deleted}).data, status=status.HTTP_200_OK)
+
+
+class ResourceChangesViewSet(ReplicaReadMixin, GenericViewSet):
+    """
+    Feed of resources and quotas changes ordered by sequence number. Common user gets changes of own resources,
+    admin gets changes of all users. Changes are returned by batches, waiting for them up to wait seconds,
+    or they are streamed as Server-Sent Events for Accept: text/event-stream header or format=sse.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = ResourceChangeSerializer
+    queryset = ResourceChange.objects.all()
+    renderer_classes = (*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer)
+    filterset_fields = ('user_id',)
+    pagination_class = None
+
+    def get_queryset(self) -> QuerySet:
+        qs = super().get_queryset()
+
+        if isinstance(self.request.user, AnonymousUser):
+            return qs.none()
+
+        if not self.request.user.is_staff:
+            return qs.filter(user_id=self.request.user.pk)
+
+        return qs
+
+    @swagger_auto_schema(query_serializer=ResourceChangesParamsSerializer(),
+                         responses={status.HTTP_200_OK: ResourceChangesSerializer()})
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        streaming = request.accepted_renderer.format == EventStreamRenderer.format
+        params = dict(request.query_params.items())
+        if streaming and 'since' not in params and 'HTTP_LAST_EVENT_ID' in request.META:
+            params['since'] = request.META['HTTP_LAST_EVENT_ID']
+        params_serializer = ResourceChangesParamsSerializer(data=params)
+        params_serializer.is_valid(raise_exception=True)
+        since, limit, wait = (params_serializer.validated_data.get(name) for name in ('since', 'limit', 'wait'))
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # Database is chosen now, while replica reads are allowed for the request.
+        queryset = queryset.using(queryset.db)
+        if since is None:
+            since = get_head(queryset.db)
+            if not streaming:
+                return Response(ResourceChangesSerializer({'seq': since, 'changes': []}).data)
+        position = get_position(queryset.db, since)
+
+        if streaming:
+            # Every stream holds a server thread, so streams must leave threads for other requests.
+            if not stream_slots.acquire(settings.FEED_MAX_STREAMS):
+                raise TooManyStreams(settings.FEED_MAX_WAIT)
+            serializer = self.get_serializer()
+            events = iter_events(queryset, position, limit, settings.FEED_STREAM_TIMEOUT, serializer.to_representation)
+            response = StreamingHttpResponse(LimitedStream(events), content_type=EventStreamRenderer.media_type)
+            response['Cache-Control'] = 'no-cache'
+            # Proxies must not buffer the stream.
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        # Waiting requests share slots with streams, poll without free slot is answered at once.
+        if wait and stream_slots.acquire(settings.FEED_MAX_STREAMS):
+            try:
+                changes = wait_changes(queryset, position, limit, wait)
+            finally:
+                stream_slots.release()
+        else:
+            changes = read_changes(queryset, position, limit)
+        data = {'seq': changes[-1].id if changes else since, 'changes': changes}
+        return Response(ResourceChangesSerializer(data).data)
@@ -0,0 +1 @@
+default_app_config = 'simple_resources_api.apps.SimpleResourcesApiConfig'
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class SimpleResourcesApiConfig(AppConfig):
+    name = 'simple_resources_api'
+
+    def ready(self):
+        import simple_resources_api.checks
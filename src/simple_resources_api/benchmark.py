@@ -0,0 +1,210 @@
+"""
+Benchmark of hot endpoints by concurrent in-process clients, used by benchmark command.
+"""
+import base64
+import math
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlencode
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections, connections
+from django.db.models import Min
+from django.http import HttpResponse
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from resources.models import Resource, UserQuota
+from users.models import User
+from .throttling import throttling_disabled
+
+PAGE_SIZE = 100
+PASSWORD = 'benchmark-password-1'
+
+
+class BenchmarkData:
+    """
+    Seeded users and resources. Resources of every user have consecutive primary keys.
+    """
+
+    def __init__(self, users_count: int, resources_per_user: int, batch_size: int = 10000):
+        self.resources_per_user = resources_per_user
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            User(email=f'benchmark-{number}@benchmark.local', password=password) for number in range(users_count)
+        )
+        UserQuota.objects.bulk_create(UserQuota(user=user, used=resources_per_user) for user in users)
+        resources = (Resource(user=user, name=f'resource-{number}') for user in users
+                     for number in range(resources_per_user))
+        while True:
+            batch = [resource for _, resource in zip(range(batch_size), resources)]
+            if not batch:
+                break
+            Resource.objects.bulk_create(batch)
+
+        self.admin = User.objects.create(email='benchmark-admin@benchmark.local', password=password, is_staff=True)
+        self.users = [(user.pk, user.email) for user in users]
+        self.tokens = {pk: f'Bearer {AccessToken.for_user(User(pk=pk))}' for pk, _ in self.users}
+        self.tokens[self.admin.pk] = f'Bearer {AccessToken.for_user(self.admin)}'
+        self.first_resources = dict(
+            Resource.objects.filter(user__in=users).values('user_id').annotate(first=Min('pk'))
+            .values_list('user_id', 'first')
+        )
+
+    @property
+    def deep_offset(self) -> int:
+        return max(self.resources_per_user - PAGE_SIZE, 0)
+
+    def user(self, index: int) -> Any:
+        return self.users[index % len(self.users)]
+
+
+def _register(client: APIClient, data: BenchmarkData, index: int) -> HttpResponse:
+    email = f'benchmark-new-{threading.get_ident()}-{index}-{time.monotonic_ns()}@benchmark.local'
+    return client.post(reverse('register'), {'email': email, 'password': PASSWORD}, format='json')
+
+
+def _login(client: APIClient, data: BenchmarkData, index: int) -> HttpResponse:
+    return client.post(reverse('login'), {'email': data.user(index)[1], 'password': PASSWORD}, format='json')
+
+
+def _create_resource(client: APIClient, data: BenchmarkData, index: int) -> HttpResponse:
+    user_id, _ = data.user(index)
+    return client.post(reverse('resources'), {'name': f'new-resource-{index}'}, format='json',
+                       HTTP_AUTHORIZATION=data.tokens[user_id])
+
+
+def _list_resources(client: APIClient, data: BenchmarkData, index: int) -> HttpResponse:
+    user_id, _ = data.user(index)
+    return client.get(reverse('resources'), {'limit': PAGE_SIZE}, HTTP_AUTHORIZATION=data.tokens[user_id])
+
+
+def _list_resources_deep_offset(client: APIClient, data: BenchmarkData, index: int) -> HttpResponse:
+    user_id, _ = data.user(index)
+    return client.get(reverse('resources'), {'limit': PAGE_SIZE, 'offset': data.deep_offset},
+                      HTTP_AUTHORIZATION=data.tokens[user_id])
+
+
+def _list_resources_deep_cursor(client: APIClient, data: BenchmarkData, index: int) -> HttpResponse:
+    user_id, _ = data.user(index)
+    # Cursor points after the last resource of previous page, like cursor of next link.
+    position = data.first_resources.get(user_id, 0) + data.deep_offset - 1
+    cursor = base64.b64encode(urlencode({'p': position}).encode()).decode()
+    return client.get(reverse('resources'), {'limit': PAGE_SIZE, 'cursor': cursor},
+                      HTTP_AUTHORIZATION=data.tokens[user_id])
+
+
+def _update_quota(client: APIClient, data: BenchmarkData, index: int) -> HttpResponse:
+    user_id, _ = data.user(index)
+    return client.patch(reverse('user-quota', kwargs=dict(pk=user_id)), {'limit': data.resources_per_user * 2 + index},
+                        format='json', HTTP_AUTHORIZATION=data.tokens[data.admin.pk])
+
+
+def _me(client: APIClient, data: BenchmarkData, index: int) -> HttpResponse:
+    user_id, _ = data.user(index)
+    return client.get(reverse('me-user'), HTTP_AUTHORIZATION=data.tokens[user_id])
+
+
+SCENARIOS: Dict[str, Callable[[APIClient, BenchmarkData, int], HttpResponse]] = {
+    'register': _register,
+    'login': _login,
+    'create_resource': _create_resource,
+    'list_resources': _list_resources,
+    'list_resources_deep_offset': _list_resources_deep_offset,
+    'list_resources_deep_cursor': _list_resources_deep_cursor,
+    'update_quota': _update_quota,
+    'me': _me,
+}
+
+
+def percentile(values: Sequence[float], part: float) -> float:
+    """
+    Returns percentile of sorted values by nearest rank method.
+    """
+    return values[min(max(math.ceil(part * len(values)) - 1, 0), len(values) - 1)]
+
+
+def run_scenario(name: str, data: BenchmarkData, requests: int, concurrency: int) -> Dict[str, Any]:
+    request = SCENARIOS[name]
+
+    def worker(worker_number: int) -> List[Any]:
+        for connection in connections.all():
+            connection.force_debug_cursor = True
+        client = APIClient()
+        results = []
+        try:
+            # The first request of thread connects to database and fills caches, so it is not measured.
+            request(client, data, requests + worker_number)
+            close_old_connections()
+            for index in range(worker_number, requests, concurrency):
+                for connection in connections.all():
+                    connection.queries_log.clear()
+                started_at = time.perf_counter()
+                response = request(client, data, index)
+                latency = time.perf_counter() - started_at
+                queries = sum(len(connection.queries_log) for connection in connections.all())
+                results.append((latency, queries, response.status_code))
+                # Connections are released after every request like by server handler.
+                close_old_connections()
+        finally:
+            connections.close_all()
+        return results
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = [result for results in executor.map(worker, range(concurrency)) for result in results]
+    duration = time.perf_counter() - started_at
+
+    latencies = sorted(latency for latency, _, _ in results)
+    return {
+        'requests': len(results),
+        'errors': sum(status_code >= 400 for _, _, status_code in results),
+        'throttled': sum(status_code == 429 for _, _, status_code in results),
+        'rps': round(len(results) / duration, 2),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+        },
+        'queries_per_request': round(sum(queries for _, queries, _ in results) / len(results), 2),
+    }
+
+
+def run_benchmark(
+        users: int, resources_per_user: int, requests: int, concurrency: int, scenarios: Optional[Sequence[str]] = None,
+        log: Callable[[str], None] = lambda message: None,
+) -> Dict[str, Any]:
+    """
+    Seeds data to current database and runs scenarios one by one, returns machine-readable results.
+    """
+    log(f'Seeding {users} users with {resources_per_user} resources each.')
+    data = BenchmarkData(users, resources_per_user)
+    results = {}
+    # All clients come from one IP, so login and registration would measure the throttling.
+    with throttling_disabled():
+        for name in scenarios or SCENARIOS:
+            log(f'Running {name}.')
+            results[name] = run_scenario(name, data, requests, concurrency)
+    return {
+        'config': {
+            'users': users,
+            'resources_per_user': resources_per_user,
+            'requests': requests,
+            'concurrency': concurrency,
+        },
+        'environment': {
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'scenarios': results,
+    }
@@ -0,0 +1,40 @@
+"""
+System checks of settings, they are run by management commands, e.g. by migrate before server is started.
+"""
+from typing import Any, List
+
+from django.conf import settings
+from django.core.checks import CheckMessage, Error, Tags, register
+
+# Caches, which are not shared by processes of server.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_cache_shared() -> bool:
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_replica_stickiness_cache(app_configs: Any, **kwargs: Any) -> List[CheckMessage]:
+    if settings.DATABASE_REPLICAS and not is_cache_shared():
+        return [Error(
+            'Replicas require cache shared by processes, otherwise reads after writes in other processes are routed '
+            'to lagging replicas.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION, e.g. to memcached.',
+            id='simple_resources_api.E001',
+        )]
+    return []
+
+
+@register(Tags.caches)
+def check_throttling_cache(app_configs: Any, **kwargs: Any) -> List[CheckMessage]:
+    if settings.THROTTLE_SHARED and not is_cache_shared():
+        return [Error(
+            'Shared throttling requires cache shared by processes, otherwise every process allows the whole rate.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION, e.g. to memcached, or disable THROTTLE_SHARED.',
+            id='simple_resources_api.E002',
+        )]
+    return []
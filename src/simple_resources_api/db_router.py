@@ -0,0 +1,55 @@
+import random
+import threading
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def set_replica_reads(enabled: bool) -> None:
+    """
+    Allows reads of current thread from replicas, it is enabled by views for safe requests.
+    """
+    _state.replica_reads = enabled
+
+
+def stick_to_primary(user_id: Any) -> None:
+    """
+    Routes reads of the user to primary while replicas may lag behind the user's writes.
+    """
+    if user_id is not None and settings.DATABASE_REPLICAS:
+        cache.set(f'replica-sticky:{user_id}', True, settings.DB_REPLICA_STICKINESS_TIMEOUT)
+
+
+def is_sticky(user_id: Any) -> bool:
+    if user_id is None or not settings.DATABASE_REPLICAS:
+        return False
+    return bool(cache.get(f'replica-sticky:{user_id}'))
+
+
+class ReplicaRouter:
+    """
+    Routes reads to random replica if they are allowed for current thread, writes and reads in transactions
+    (including select_for_update locks) are routed to primary.
+    """
+
+    def db_for_read(self, model: Any, **hints: Any) -> Optional[str]:
+        if (
+            not settings.DATABASE_REPLICAS
+            or not getattr(_state, 'replica_reads', False)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model: Any, **hints: Any) -> Optional[str]:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> Optional[bool]:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints: Any) -> Optional[bool]:
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,21 @@
+from drf_yasg import openapi
+from drf_yasg.inspectors.query import DjangoRestResponsePagination
+
+from .pagination import LimitOffsetOrCursorPagination, CountType
+
+
+class LimitOffsetOrCursorPaginationInspector(DjangoRestResponsePagination):
+    """
+    Adds nullable count and count type to paginated response schema.
+    """
+
+    def get_paginated_response(self, paginator, response_schema):
+        paged_schema = super().get_paginated_response(paginator, response_schema)
+        if isinstance(paginator, LimitOffsetOrCursorPagination):
+            paged_schema.properties['count'] = openapi.Schema(type=openapi.TYPE_INTEGER, x_nullable=True)
+            paged_schema.properties['count_type'] = openapi.Schema(
+                type=openapi.TYPE_STRING, enum=[CountType.EXACT, CountType.CACHED, CountType.ESTIMATED, CountType.NONE]
+            )
+            paged_schema.properties.move_to_end('count_type', last=False)
+            paged_schema.properties.move_to_end('count', last=False)
+        return paged_schema
@@ -0,0 +1,136 @@
+"""
+Per-request performance metrics: SQL queries count and time, authentication and serializers time, total time.
+Metrics of current request are collected in thread local storage and aggregated to Prometheus histograms.
+Metrics of gunicorn workers are aggregated by prometheus_client multiprocess mode, if PROMETHEUS_MULTIPROC_DIR
+environment variable is set.
+"""
+import functools
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+from rest_framework import serializers
+
+_local = threading.local()
+
+REQUESTS = Counter('http_requests_total', 'Number of requests.', ('view', 'method', 'status'))
+DURATION = Histogram('http_request_duration_seconds', 'Total time of request.', ('view',))
+DB_QUERIES = Histogram('http_request_db_queries', 'Number of SQL queries of request.', ('view',),
+                       buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, float('inf')))
+DB_DURATION = Histogram('http_request_db_duration_seconds', 'Time of SQL queries of request.', ('view',))
+AUTH_DURATION = Histogram('http_request_auth_duration_seconds', 'Time of authentication of request.', ('view',))
+SERIALIZER_DURATION = Histogram('http_request_serializer_duration_seconds', 'Time of serializers of request.',
+                                ('view',))
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.view = 'unresolved'
+        self.db_queries = 0
+        self.timings = defaultdict(float)
+        self.active = set()
+
+    def execute_wrapper(self, execute: Callable, sql: str, params: Any, many: bool, context: Any) -> Any:
+        """
+        Database execute wrapper, which counts queries and their time.
+        """
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.timings['db'] += time.perf_counter() - started_at
+
+    def observe(self, method: str, status: int) -> None:
+        REQUESTS.labels(self.view, method, status).inc()
+        DURATION.labels(self.view).observe(self.timings['total'])
+        DB_QUERIES.labels(self.view).observe(self.db_queries)
+        DB_DURATION.labels(self.view).observe(self.timings['db'])
+        AUTH_DURATION.labels(self.view).observe(self.timings['auth'])
+        SERIALIZER_DURATION.labels(self.view).observe(self.timings['serializer'])
+
+    def server_timing(self) -> str:
+        return ', '.join([
+            f'db;dur={self.timings["db"] * 1000:.3f};desc="{self.db_queries} queries"',
+            f'auth;dur={self.timings["auth"] * 1000:.3f}',
+            f'serializer;dur={self.timings["serializer"] * 1000:.3f}',
+            f'total;dur={self.timings["total"] * 1000:.3f}',
+        ])
+
+
+def get_request_metrics() -> Optional[RequestMetrics]:
+    return getattr(_local, 'metrics', None)
+
+
+def set_request_metrics(metrics: Optional[RequestMetrics]) -> None:
+    _local.metrics = metrics
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """
+    Adds time of the block to timing of current request, nested blocks of the same timing are counted once.
+    """
+    metrics = get_request_metrics()
+    if metrics is None or name in metrics.active:
+        yield
+        return
+
+    metrics.active.add(name)
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started_at
+        metrics.active.discard(name)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with timer(name):
+                return function(*args, **kwargs)
+
+        wrapper.timed = True
+        return wrapper
+
+    return decorator
+
+
+def instrument_serializers() -> None:
+    """
+    Times validation and representation of all serializers.
+    """
+    for cls, name in (
+        (serializers.BaseSerializer, 'is_valid'),
+        (serializers.ListSerializer, 'is_valid'),
+    ):
+        if not getattr(getattr(cls, name), 'timed', False):
+            setattr(cls, name, timed('serializer')(getattr(cls, name)))
+    data = serializers.BaseSerializer.data
+    if not getattr(data.fget, 'timed', False):
+        serializers.BaseSerializer.data = property(timed('serializer')(data.fget))
+
+
+def get_view_name(view_func: Callable, method: str) -> str:
+    """
+    Returns name of view class and action, e.g. ResourcesViewSet.create.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method.lower(), method.lower())}'
+
+
+def generate_metrics() -> bytes:
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
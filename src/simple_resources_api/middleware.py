@@ -0,0 +1,88 @@
+import time
+from contextlib import ExitStack
+from cProfile import Profile
+from typing import Any, Callable, Dict, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+
+from .metrics import RequestMetrics, get_request_metrics, set_request_metrics, get_view_name, instrument_serializers
+from .profiling import get_profiling_reason, save_profile
+
+
+class MetricsMiddleware:
+    """
+    Collects SQL, authentication, serializers and total time of requests by views and actions.
+    Timings are sent in Server-Timing header if SERVER_TIMING setting is enabled.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        metrics = RequestMetrics()
+        set_request_metrics(metrics)
+        started_at = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            set_request_metrics(None)
+        metrics.timings['total'] = time.perf_counter() - started_at
+
+        metrics.observe(request.method, response.status_code)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args: Tuple, view_kwargs: Dict[str, Any]):
+        metrics = get_request_metrics()
+        if metrics is not None:
+            metrics.view = get_view_name(view_func, request.method)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests by cProfile, if it is requested by staff user or request is sampled. Staff is authenticated
+    before profiling, so requests of other users are not slowed down by their flags.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        reason = get_profiling_reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        created_at = timezone.now()
+        profile = Profile()
+        started_at = time.perf_counter()
+        profile.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+        duration = time.perf_counter() - started_at
+
+        # User is set to Django request by DRF authentication.
+        user = getattr(request, 'user', None)
+        response['X-Profile-Id'] = save_profile(profile, {
+            'created_at': created_at.isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': getattr(request, 'profiled_view', None),
+            'status_code': response.status_code,
+            'duration': duration,
+            'user_id': getattr(user, 'pk', None),
+            'reason': reason,
+        })
+        return response
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args: Tuple, view_kwargs: Dict[str, Any]):
+        request.profiled_view = get_view_name(view_func, request.method)
@@ -0,0 +1,136 @@
+import hashlib
+from datetime import datetime
+from typing import Any, List, Optional
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.pagination import BasePagination
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import BaseRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .db_router import set_replica_reads, stick_to_primary, is_sticky
+from .renderers import CSVRenderer, NDJSONRenderer
+
+
+class ConditionalGetMixin:
+    """
+    Sends ETag and Last-Modified headers from retrieve and list actions.
+    Conditional requests of unchanged data are answered by 304 without serialization.
+    ETag depends on negotiated media type, so representations of different renderers are not confused by caches.
+    """
+    version_field = 'updated_at'
+
+    def get_list_version(self) -> Optional[datetime]:
+        """
+        Returns version of listed collection, lists without version are not conditional.
+        """
+        return None
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        instance = self.get_object()
+        version = getattr(instance, self.version_field)
+        etag = self.make_etag(type(instance).__name__, instance.pk, request.accepted_media_type, version)
+        response = get_conditional_response(request, etag=etag, last_modified=int(version.timestamp()))
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return self.set_version_headers(response, etag, version)
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        version = self.get_list_version()
+        if version is None:
+            return super().list(request, *args, **kwargs)
+
+        etag = self.make_etag(
+            type(self).__name__, request.user.pk, request.get_full_path(), request.accepted_media_type, version
+        )
+        response = get_conditional_response(request, etag=etag, last_modified=int(version.timestamp()))
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return self.set_version_headers(response, etag, version)
+
+    @staticmethod
+    def make_etag(*parts: Any) -> str:
+        return 'W/' + quote_etag(hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest())
+
+    @staticmethod
+    def set_version_headers(response: HttpResponseBase, etag: str, version: datetime) -> HttpResponseBase:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version.timestamp())
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+
+class ValuesListMixin:
+    """
+    List action reads only serialized columns as dicts by values() and skips serializer, so model instances and
+    fields representation are not built. Serializer fields must be model fields, which database values are the same
+    as their representation.
+    """
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        queryset = self.filter_queryset(self.get_queryset()).values(*self.get_serializer_class().Meta.fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(queryset))
+
+
+class ReplicaReadMixin:
+    """
+    Reads of safe requests are routed to replicas, unless the user has written recently.
+    Unsafe requests route the user's reads to primary for a short time.
+    """
+
+    def initial(self, request: Request, *args: Any, **kwargs: Any) -> None:
+        set_replica_reads(False)
+        super().initial(request, *args, **kwargs)
+        # Authentication and permissions are checked on primary.
+        set_replica_reads(request.method in SAFE_METHODS and not is_sticky(request.user.pk))
+
+    def finalize_response(self, request: Request, response: Response, *args: Any, **kwargs: Any) -> Response:
+        set_replica_reads(False)
+        if request.method not in SAFE_METHODS:
+            stick_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class StreamingExportMixin:
+    """
+    Export action streams all objects of list (with the same filters and scoping) as NDJSON or CSV, which is chosen
+    by format parameter or Accept header. Objects are read by server side cursor in chunks, so memory usage is flat.
+    """
+    export_renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    @property
+    def paginator(self) -> Optional[BasePagination]:
+        # Export is not paginated.
+        if self.action == 'export':
+            return None
+        return super().paginator
+
+    def get_renderers(self) -> List[BaseRenderer]:
+        if self.action == 'export':
+            return [renderer() for renderer in self.export_renderer_classes]
+        return super().get_renderers()
+
+    @swagger_auto_schema(responses={status.HTTP_200_OK: 'Stream of objects in NDJSON or CSV format.'})
+    def export(self, request: Request, *args: Any, **kwargs: Any) -> StreamingHttpResponse:
+        queryset = self.filter_queryset(self.get_queryset())
+        # Database is chosen now, while replica reads are allowed for the request.
+        queryset = queryset.using(queryset.db)
+        serializer = self.get_serializer()
+        fields = [name for name, field in serializer.fields.items() if not field.write_only]
+        rows = map(serializer.to_representation, queryset.iterator(chunk_size=settings.STREAMING_CHUNK_SIZE))
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(renderer.render_stream(fields, rows), content_type=renderer.media_type)
+        filename = f'{queryset.model._meta.verbose_name_plural}.{renderer.format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,187 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import coreapi
+import coreschema
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import QuerySet
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination, Cursor
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination by primary key. Empty cursor parameter means the first page.
+    """
+    ordering = 'pk'
+    page_size = settings.CURSOR_PAGINATION_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = settings.CURSOR_PAGINATION_MAX_PAGE_SIZE
+
+    def decode_cursor(self, request: Request) -> Optional[Cursor]:
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        self.pk_name = queryset.model._meta.pk.attname
+        return super().paginate_queryset(queryset, request, view)
+
+    def _get_position_from_instance(self, instance: Any, ordering: Tuple[str, ...]) -> str:
+        # Rows of values() querysets have primary key by its attribute name.
+        if isinstance(instance, dict) and ordering[0].lstrip('-') == 'pk':
+            return str(instance[self.pk_name])
+        return super()._get_position_from_instance(instance, ordering)
+
+
+class CountType:
+    AUTO = 'auto'
+    EXACT = 'exact'
+    CACHED = 'cached'
+    ESTIMATED = 'estimated'
+    NONE = 'none'
+
+    choices = (AUTO, EXACT, CACHED, ESTIMATED, NONE)
+
+
+class LimitOffsetOrCursorPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination, which is switched to keyset pagination by cursor query parameter.
+    Total count is calculated according to count query parameter:
+        auto - table statistics for large unfiltered querysets, exact count otherwise;
+        exact - exact count;
+        cached - exact count, cached for a short time;
+        estimated - planner estimate;
+        none - count is skipped.
+    """
+    cursor_pagination_class = KeysetPagination
+    count_query_param = 'count'
+
+    def __init__(self):
+        self.cursor_paginator = self.cursor_pagination_class()
+        self.use_cursor = False
+        self.has_next = False
+        self.count_type = None
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        self.use_cursor = self.cursor_paginator.cursor_query_param in request.query_params
+        if self.use_cursor:
+            page = self.cursor_paginator.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.cursor_paginator.display_page_controls
+            return page
+
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        self.count, self.count_type = self.get_count_with_type(queryset, request)
+        if self.count is not None and self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        # One extra row shows whether next page exists, so next link does not depend on count type.
+        page = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(page) > self.limit
+        return page[:self.limit]
+
+    def get_count_with_type(self, queryset: QuerySet, request: Request) -> Tuple[Optional[int], str]:
+        count_type = request.query_params.get(self.count_query_param, settings.PAGINATION_COUNT_TYPE)
+        if count_type not in CountType.choices:
+            raise ValidationError({self.count_query_param: [f'Must be one of: {", ".join(CountType.choices)}.']})
+
+        if count_type == CountType.NONE:
+            return None, CountType.NONE
+
+        if count_type == CountType.CACHED:
+            return self.get_cached_count(queryset)
+
+        if count_type == CountType.ESTIMATED:
+            return self.get_estimated_count(queryset), CountType.ESTIMATED
+
+        # Filtered lists are counted by one query, planning estimate would be followed by count for small lists.
+        if count_type == CountType.AUTO and not queryset.query.where:
+            estimated_count = self.get_table_estimated_count(queryset)
+            if estimated_count is not None and estimated_count >= settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+                return estimated_count, CountType.ESTIMATED
+
+        return self.get_count(queryset), CountType.EXACT
+
+    def get_cached_count(self, queryset: QuerySet) -> Tuple[int, str]:
+        sql, params = queryset.query.sql_with_params()
+        key = 'pagination-count:' + hashlib.md5(f'{queryset.db}:{sql}:{params}'.encode()).hexdigest()
+        count = cache.get(key)
+        if count is not None:
+            return count, CountType.CACHED
+
+        count = self.get_count(queryset)
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count, CountType.EXACT
+
+    def get_table_estimated_count(self, queryset: QuerySet) -> Optional[int]:
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # Statistics of never analyzed table are negative.
+        return int(row[0]) if row is not None and row[0] >= 0 else None
+
+    def get_estimated_count(self, queryset: QuerySet) -> int:
+        if not queryset.query.where:
+            estimated_count = self.get_table_estimated_count(queryset)
+            if estimated_count is not None:
+                return estimated_count
+
+        with connections[queryset.db].cursor() as cursor:
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def get_paginated_response(self, data: List[Any]) -> Response:
+        if self.use_cursor:
+            return self.cursor_paginator.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_type', self.count_type),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def to_html(self) -> str:
+        if self.use_cursor:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+    def get_schema_fields(self, view: Any) -> List[Any]:
+        return super().get_schema_fields(view) + [
+            field for field in self.cursor_paginator.get_schema_fields(view) if field.name != self.limit_query_param
+        ] + [
+            coreapi.Field(
+                name=self.count_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.Enum(
+                    CountType.choices,
+                    title='Count',
+                    description='Type of total count: ' + ', '.join(CountType.choices) + '.',
+                ),
+            )
+        ]
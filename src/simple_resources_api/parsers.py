@@ -0,0 +1,34 @@
+from typing import Any, IO, Optional
+
+import msgpack
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import orjson, MessagePackRenderer
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser, which decodes by orjson if it is installed and request encoding is UTF-8.
+    """
+
+    def parse(self, stream: IO, media_type: Optional[str] = None, parser_context: Any = None) -> Any:
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as e:
+            raise ParseError(f'JSON parse error - {e}')
+
+
+class MessagePackParser(BaseParser):
+    media_type = MessagePackRenderer.media_type
+
+    def parse(self, stream: IO, media_type: Optional[str] = None, parser_context: Any = None) -> Any:
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except ValueError as e:
+            raise ParseError(f'MessagePack parse error - {e}')
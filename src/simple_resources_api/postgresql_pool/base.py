@@ -0,0 +1,74 @@
+"""
+PostgreSQL backend with connections pool per process and connections health checks.
+
+Extra settings of database:
+    POOL_SIZE - max connections count of process, pool is disabled by 0;
+    POOL_TIMEOUT - seconds to wait for released connection if all connections are in use;
+    CONN_HEALTH_CHECKS - connections are checked before reuse;
+    CONN_MAX_AGE - pooled connections are recycled after this age, persistent connections are reused as usual.
+"""
+from typing import Any, Dict, Optional
+
+from django.db.backends.postgresql import base, creation
+
+from .pool import ConnectionPool, get_pool, close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name: str, verbosity: int) -> None:
+        # Idle pooled connections to test database prevent its dropping.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    health_check_done = False
+
+    @property
+    def pool(self) -> Optional[ConnectionPool]:
+        if not self.settings_dict.get('POOL_SIZE'):
+            return None
+        key = (self.alias, self.settings_dict['HOST'], self.settings_dict['PORT'], self.settings_dict['NAME'])
+        return get_pool(key, lambda: ConnectionPool(
+            max_size=self.settings_dict['POOL_SIZE'],
+            timeout=self.settings_dict.get('POOL_TIMEOUT', 10),
+            max_age=self.settings_dict['CONN_MAX_AGE'],
+            health_checks=self.settings_dict.get('CONN_HEALTH_CHECKS', False),
+        ))
+
+    def get_new_connection(self, conn_params: Dict[str, Any]) -> Any:
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        self.isolation_level = connection.isolation_level
+        return connection
+
+    def _close(self) -> None:
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        pool.release(self.connection)
+
+    def connect(self) -> None:
+        # New connection is not checked, autocommit is set by connect after the connection is created.
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self) -> None:
+        # Persistent connection is checked once per request, on its first usage.
+        if self.connection is not None and not self.health_check_done and self.settings_dict.get('CONN_HEALTH_CHECKS'):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self) -> None:
+        # Pooled connection is returned to pool between requests, so it is shared by threads of process.
+        if self.connection is not None and self.pool is not None:
+            self.close()
+            return
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from psycopg2 import OperationalError, extensions
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections of one process. Pool size caps connections count, requests wait for
+    released connection up to timeout. Connections are checked before reuse and recycled after max age.
+    """
+
+    def __init__(self, max_size: int, timeout: float, max_age: Optional[float] = None, health_checks: bool = True):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_checks = health_checks
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._created_at = {}
+        self._connecting = 0
+        self._stats = dict(connects=0, connect_time=0.0, waits=0, wait_time=0.0, timeouts=0, health_check_failures=0)
+
+    def acquire(self, connect: Callable[[], Any]) -> Any:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection = self._take(deadline)
+            if connection is None:
+                return self._connect(connect)
+            if self._is_usable(connection):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection: Any) -> None:
+        if not connection.closed and connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+        if connection.closed or self._is_obsolete(connection):
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def close(self) -> None:
+        """
+        Closes idle connections, connections in use are closed on release.
+        """
+        with self._condition:
+            connections, self._idle = list(self._idle), deque()
+        for connection in connections:
+            self._discard(connection)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            size = len(self._created_at) + self._connecting
+            return dict(self._stats, max_size=self.max_size, size=size, idle=len(self._idle),
+                        in_use=size - len(self._idle))
+
+    def _take(self, deadline: float) -> Optional[Any]:
+        """
+        Returns idle connection or reserves place for a new one, returning None.
+        """
+        with self._condition:
+            waited_at = None
+            while not self._idle and len(self._created_at) + self._connecting >= self.max_size:
+                if waited_at is None:
+                    waited_at = time.monotonic()
+                    self._stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._stats['wait_time'] += time.monotonic() - waited_at
+                    logger.warning('Connection pool is exhausted: %s connections are in use.', self.max_size)
+                    raise OperationalError(f'Connection pool is exhausted, no connection within {self.timeout}s.')
+                self._condition.wait(remaining)
+            if waited_at is not None:
+                self._stats['wait_time'] += time.monotonic() - waited_at
+            if self._idle:
+                return self._idle.pop()
+            self._connecting += 1
+            return None
+
+    def _connect(self, connect: Callable[[], Any]) -> Any:
+        started_at = time.monotonic()
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self._connecting -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._connecting -= 1
+            self._created_at[connection] = time.monotonic()
+            self._stats['connects'] += 1
+            self._stats['connect_time'] += time.monotonic() - started_at
+        return connection
+
+    def _discard(self, connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._created_at.pop(connection, None)
+            self._condition.notify()
+
+    def _is_obsolete(self, connection: Any) -> bool:
+        return bool(self.max_age) and time.monotonic() - self._created_at.get(connection, 0) >= self.max_age
+
+    def _is_usable(self, connection: Any) -> bool:
+        if connection.closed:
+            return False
+        if not self.health_checks:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return True
+        except Exception:
+            with self._condition:
+                self._stats['health_check_failures'] += 1
+            return False
+
+
+_pools: Dict[Hashable, ConnectionPool] = {}
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+
+
+def get_pool(key: Hashable, factory: Callable[[], ConnectionPool]) -> ConnectionPool:
+    global _pools_pid
+    with _pools_lock:
+        # Connections inherited from parent process are not reused by forked workers.
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        if key not in _pools:
+            _pools[key] = factory()
+        return _pools[key]
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def pools_stats() -> List[Dict[str, Any]]:
+    with _pools_lock:
+        pools = list(_pools.items())
+    return [dict(pool.stats(), alias=key[0], pid=os.getpid()) for key, pool in pools]
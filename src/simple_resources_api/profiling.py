@@ -0,0 +1,100 @@
+"""
+On-demand profiling of requests. Profiles are stored as pstats files with JSON metadata in PROFILING_DIR,
+only PROFILING_MAX_PROFILES latest profiles are kept.
+"""
+import json
+import os
+import random
+import re
+import uuid
+from cProfile import Profile
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.http import HttpRequest
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+
+from users.authentication import CachedJWTAuthentication
+
+REQUESTED = 'requested'
+SAMPLED = 'sampled'
+
+_profile_id_re = re.compile(r'^[0-9a-f]{32}$')
+
+
+def is_staff_request(request: HttpRequest) -> bool:
+    """
+    Authenticates request before the view, validated tokens and users are cached by the authentication.
+    """
+    try:
+        user_and_token = CachedJWTAuthentication().authenticate(Request(request))
+    except AuthenticationFailed:
+        return False
+    return user_and_token is not None and user_and_token[0].is_staff
+
+
+def get_profiling_reason(request: HttpRequest) -> Optional[str]:
+    """
+    Returns reason to profile request: flag of request (X-Profile header or profile query parameter) of staff user
+    or sampling. Flag of other users is ignored, so they can't slow down the server by profiling.
+    """
+    if (request.META.get('HTTP_X_PROFILE') == '1' or request.GET.get('profile') == '1') and is_staff_request(request):
+        return REQUESTED
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return SAMPLED
+    return None
+
+
+def _path(profile_id: str, extension: str) -> str:
+    return os.path.join(settings.PROFILING_DIR, f'{profile_id}.{extension}')
+
+
+def save_profile(profile: Profile, metadata: Dict[str, Any]) -> str:
+    profile_id = uuid.uuid4().hex
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    profile.dump_stats(_path(profile_id, 'prof'))
+    # Metadata is written last, so listed profiles are complete.
+    tmp_path = _path(profile_id, 'tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({'id': profile_id, **metadata}, file)
+    os.replace(tmp_path, _path(profile_id, 'json'))
+    _remove_old_profiles()
+    return profile_id
+
+
+def _read_metadata(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        # Profile is removed by other process.
+        return None
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    Returns metadata of stored profiles, newest first.
+    """
+    try:
+        names = os.listdir(settings.PROFILING_DIR)
+    except FileNotFoundError:
+        return []
+    profiles = [_read_metadata(os.path.join(settings.PROFILING_DIR, name)) for name in names if name.endswith('.json')]
+    return sorted(filter(None, profiles), key=lambda metadata: metadata['created_at'], reverse=True)
+
+
+def get_profile_path(profile_id: str) -> Optional[str]:
+    if not _profile_id_re.match(profile_id):
+        return None
+    path = _path(profile_id, 'prof')
+    return path if os.path.exists(_path(profile_id, 'json')) and os.path.exists(path) else None
+
+
+def _remove_old_profiles() -> None:
+    for metadata in list_profiles()[settings.PROFILING_MAX_PROFILES:]:
+        for extension in ('json', 'prof'):
+            try:
+                os.remove(_path(metadata['id'], extension))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,138 @@
+import csv
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Output of stdlib encoder is the same as of DRF JSONRenderer with default settings.
+_json_encoder = JSONEncoder(
+    ensure_ascii=not api_settings.UNICODE_JSON,
+    allow_nan=not api_settings.STRICT_JSON,
+    separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': '),
+)
+
+
+def json_dumps(data: Any) -> bytes:
+    """
+    Encodes data to compact JSON by orjson if it is installed, otherwise by stdlib encoder.
+    Dates and times are passed to DRF encoder, so their format is the same for both encoders.
+    """
+    content = None
+    if orjson is not None and api_settings.COMPACT_JSON and api_settings.UNICODE_JSON:
+        try:
+            content = orjson.dumps(data, default=_json_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            # E.g. integers out of 64 bits range are not supported by orjson.
+            pass
+    if content is None:
+        content = _json_encoder.encode(data).encode()
+    # Line separators are escaped like by JSONRenderer, they are not valid in JavaScript strings.
+    return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class _Echo:
+    """
+    File-like object, which returns written value instead of storing it.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(fields: Sequence[str], rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Yields CSV lines of header and rows, so large tables are streamed without buffering.
+    """
+    writer = csv.DictWriter(_Echo(), fieldnames=fields, extrasaction='ignore')
+    # DictWriter.writeheader returns written value only since Python 3.8.
+    yield writer.writerow(dict(zip(fields, fields)))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders list of objects or single object (e.g. error) to CSV with header of the first object keys.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Any = None) -> str:
+        if data is None:
+            return ''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return ''.join(iter_csv(fields, rows))
+
+    def render_stream(self, fields: Sequence[str], rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        return iter_csv(fields, rows)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders list of objects or single object (e.g. error) to JSON object per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Any = None) -> bytes:
+        if data is None:
+            return b''
+        return b''.join(self.render_stream((), data if isinstance(data, list) else [data]))
+
+    def render_stream(self, fields: Sequence[str], rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        for row in rows:
+            yield json_dumps(row) + b'\n'
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Renders Server-Sent Events, single object (e.g. error) is rendered as error event.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = None
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Any = None) -> bytes:
+        if data is None:
+            return b''
+        return self.render_event(None, 'error', data)
+
+    @staticmethod
+    def render_event(id: Any, event: str, data: Any) -> bytes:
+        id_line = b'' if id is None else f'id: {id}\n'.encode()
+        return id_line + f'event: {event}\n'.encode() + b'data: ' + json_dumps(data) + b'\n\n'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer, which encodes by orjson if it is installed. Indented JSON is rendered by stdlib encoder.
+    """
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Any = None) -> bytes:
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return json_dumps(data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Any = None) -> bytes:
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_json_encoder.default, use_bin_type=True)
@@ -1,16 +1,66 @@
+import hashlib
+import threading
+from typing import Dict, NamedTuple
+
+from django.urls import reverse
+from django.utils.http import quote_etag
 from rest_framework import permissions
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+api_info = openapi.Info(
+   title="Snippets API",
+   default_version='v1',
+   description="Test description",
+   terms_of_service="https://www.google.com/policies/terms/",
+   contact=openapi.Contact(email="contact@snippets.local"),
+   license=openapi.License(name="BSD License"),
+)
+
 schema_view = get_schema_view(
-   openapi.Info(
-      title="Snippets API",
-      default_version='v1',
-      description="Test description",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@snippets.local"),
-      license=openapi.License(name="BSD License"),
-   ),
+   api_info,
    public=True,
    permission_classes=(permissions.AllowAny,),
 )
+
+
+class SchemaDocument(NamedTuple):
+    content: bytes
+    content_type: str
+    etag: str
+
+
+CODECS = {
+    '.json': (OpenAPICodecJson, 'application/json'),
+    '.yaml': (OpenAPICodecYaml, 'application/yaml; charset=utf-8'),
+}
+
+_documents: Dict[str, SchemaDocument] = {}
+_lock = threading.Lock()
+
+
+def generate_schema_documents() -> None:
+    """
+    Generates public schema once in process, so it is regenerated only by restart with new code.
+    It is called by warmup, so workers share the schema of preloaded application.
+    """
+    # Schema is generated for anonymous request, host and schemes of the request are omitted, so clients use host
+    # of the schema.
+    request = Request(APIRequestFactory().get(reverse('schema-json', kwargs=dict(format='.json'))))
+    schema = schema_view.generator_class(api_info).get_schema(request=request, public=True)
+    schema.pop('host', None)
+    schema.pop('schemes', None)
+    for format, (codec_class, content_type) in CODECS.items():
+        content = codec_class(validators=[]).encode(schema)
+        _documents[format] = SchemaDocument(content, content_type, quote_etag(hashlib.sha256(content).hexdigest()))
+
+
+def get_schema_document(format: str) -> SchemaDocument:
+    if format not in _documents:
+        with _lock:
+            if format not in _documents:
+                generate_schema_documents()
+    return _documents[format]
@@ -0,0 +1,34 @@
+from rest_framework import serializers
+
+
+class DatabasePoolStatsSerializer(serializers.Serializer):
+    """
+    Used in schema views.
+    """
+    alias = serializers.CharField()
+    pid = serializers.IntegerField()
+    max_size = serializers.IntegerField()
+    size = serializers.IntegerField()
+    in_use = serializers.IntegerField()
+    idle = serializers.IntegerField()
+    connects = serializers.IntegerField()
+    connect_time = serializers.FloatField(help_text='Total time of new connections in seconds.')
+    waits = serializers.IntegerField()
+    wait_time = serializers.FloatField(help_text='Total time of waiting for released connection in seconds.')
+    timeouts = serializers.IntegerField()
+    health_check_failures = serializers.IntegerField()
+
+
+class ProfileSerializer(serializers.Serializer):
+    """
+    Used in schema views.
+    """
+    id = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    method = serializers.CharField()
+    path = serializers.CharField()
+    view = serializers.CharField(allow_null=True)
+    status_code = serializers.IntegerField()
+    duration = serializers.FloatField(help_text='Time of request in seconds, including profiling overhead.')
+    user_id = serializers.IntegerField(allow_null=True)
+    reason = serializers.ChoiceField(choices=('requested', 'sampled'))
@@ -40,11 +40,14 @@ INSTALLED_APPS = [
     'rest_framework',
     'django_filters',
     'drf_yasg',
+    'simple_resources_api',
     'users',
     'resources',
 ]
 
 MIDDLEWARE = [
+    'simple_resources_api.middleware.MetricsMiddleware',
+    'simple_resources_api.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,11 +82,36 @@ WSGI_APPLICATION = 'simple_resources_api.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'simple_resources_api.postgresql_pool',
         'NAME': 'postgres',
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'USER': os.getenv('DB_USER', 'postgres'),
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        # Connections count of every process is capped by pool size, pooling is disabled by 0.
+        'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', '4')),
+        'POOL_TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+    }
+}
+
+# Replicas are set by comma separated hosts with optional ports, e.g. "replica1:5432,replica2:5432".
+DATABASE_REPLICAS = []
+for number, address in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica_{number}'] = {**DATABASES['default'], 'HOST': host, 'PORT': port, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['simple_resources_api.db_router.ReplicaRouter']
+# Reads of user are routed to primary for this time after user's writes, so replication lag is not visible.
+DB_REPLICA_STICKINESS_TIMEOUT = int(os.getenv('DB_REPLICA_STICKINESS_TIMEOUT', '5'))
+
+# Cache must be shared by processes (e.g. memcached) with replicas, otherwise replica stickiness works only in the same
+# process, it is checked by system checks.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -130,16 +158,68 @@ AUTH_USER_MODEL = 'users.User'
 APPEND_SLASH = False
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'simple_resources_api.pagination.LimitOffsetOrCursorPagination',
+    'DEFAULT_RENDERER_CLASSES': (
+        'simple_resources_api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'simple_resources_api.renderers.MessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'simple_resources_api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'simple_resources_api.parsers.MessagePackParser',
+    ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'users.authentication.CachedJWTAuthentication',
+    ),
+    # Rates of login and registration by client IP and by email, e.g. 10/min, empty rate disables throttling.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv('THROTTLE_LOGIN_IP_RATE', '60/min') or None,
+        'login_email': os.getenv('THROTTLE_LOGIN_EMAIL_RATE', '10/min') or None,
+        'register_ip': os.getenv('THROTTLE_REGISTER_IP_RATE', '20/min') or None,
+        'register_email': os.getenv('THROTTLE_REGISTER_EMAIL_RATE', '5/min') or None,
+    },
+    # Number of proxies before application, client IP is taken from X-Forwarded-For header then.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES')) if os.getenv('NUM_PROXIES') else None,
 }
 
+# Token buckets of throttling are kept in process, at most THROTTLE_MAX_BUCKETS ones.
+# With THROTTLE_SHARED=1 they are kept in cache, which must be shared by processes, it is checked by system checks.
+THROTTLE_MAX_BUCKETS = int(os.getenv('THROTTLE_MAX_BUCKETS', '100000'))
+THROTTLE_SHARED = os.getenv('THROTTLE_SHARED', '0') == '1'
+
+SIMPLE_JWT = {
+    'ROTATE_REFRESH_TOKENS': os.getenv('JWT_ROTATE_REFRESH_TOKENS', '0') == '1',
+    'BLACKLIST_AFTER_ROTATION': os.getenv('JWT_BLACKLIST_AFTER_ROTATION', '0') == '1',
+}
+
+if SIMPLE_JWT['BLACKLIST_AFTER_ROTATION']:
+    INSTALLED_APPS.append('rest_framework_simplejwt.token_blacklist')
+
+AUTH_USERS_CACHE_SIZE = int(os.getenv('AUTH_USERS_CACHE_SIZE', '10000'))
+AUTH_USERS_CACHE_TIMEOUT = int(os.getenv('AUTH_USERS_CACHE_TIMEOUT', '30'))
+AUTH_TOKENS_CACHE_SIZE = int(os.getenv('AUTH_TOKENS_CACHE_SIZE', '10000'))
+AUTH_TOKENS_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKENS_CACHE_TIMEOUT', '300'))
+
+CURSOR_PAGINATION_PAGE_SIZE = int(os.getenv('CURSOR_PAGINATION_PAGE_SIZE', '100'))
+CURSOR_PAGINATION_MAX_PAGE_SIZE = int(os.getenv('CURSOR_PAGINATION_MAX_PAGE_SIZE', '1000'))
+
+PAGINATION_COUNT_TYPE = os.getenv('PAGINATION_COUNT_TYPE', 'auto')
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', '100000'))
+PAGINATION_COUNT_CACHE_TIMEOUT = int(os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', '10'))
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 SWAGGER_SETTINGS = {
+   'DEFAULT_INFO': 'simple_resources_api.schema.api_info',
+   # UI pages load precomputed schema.
+   'SPEC_URL': ('schema-json', {'format': '.json'}),
+   'DEFAULT_PAGINATOR_INSPECTORS': [
+      'simple_resources_api.inspectors.LimitOffsetOrCursorPaginationInspector',
+      'drf_yasg.inspectors.CoreAPICompatInspector',
+   ],
    'SECURITY_DEFINITIONS': {
       'Bearer': {
             'type': 'apiKey',
@@ -148,3 +228,51 @@ SWAGGER_SETTINGS = {
       }
    }
 }
+
+REDOC_SETTINGS = {
+   'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+# Max age of schema in HTTP caches, it is revalidated by ETag then.
+SCHEMA_CACHE_MAX_AGE = int(os.getenv('SCHEMA_CACHE_MAX_AGE', '300'))
+
+# Timings of requests are sent in Server-Timing header.
+SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'
+# Metrics endpoint requires this token in Authorization header, it is disabled without the token.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Profiles of requests are stored in this directory, only the latest profiles are kept.
+PROFILING_DIR = os.getenv('PROFILING_DIR', '/tmp/profiles')
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', '100'))
+# Part of requests, which are profiled without request of staff user.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+
+# Rows are fetched by server side cursor by chunks of this size for streamed responses.
+STREAMING_CHUNK_SIZE = int(os.getenv('STREAMING_CHUNK_SIZE', '2000'))
+
+RESOURCES_BATCH_MAX_SIZE = int(os.getenv('RESOURCES_BATCH_MAX_SIZE', '1000'))
+RESOURCES_DELETE_CHUNK_SIZE = int(os.getenv('RESOURCES_DELETE_CHUNK_SIZE', '1000'))
+# Partitions count of resources table, which is partitioned by partition_resources command.
+RESOURCES_PARTITIONS = int(os.getenv('RESOURCES_PARTITIONS', '16'))
+# Changes feed: batch size of changes, max wait of long polling, interval of polling the log by waiting requests,
+# duration of Server-Sent Events stream and interval of its heartbeats in seconds.
+FEED_BATCH_SIZE = int(os.getenv('FEED_BATCH_SIZE', '100'))
+FEED_MAX_BATCH_SIZE = int(os.getenv('FEED_MAX_BATCH_SIZE', '1000'))
+FEED_MAX_WAIT = int(os.getenv('FEED_MAX_WAIT', '30'))
+FEED_POLL_INTERVAL = float(os.getenv('FEED_POLL_INTERVAL', '1'))
+FEED_STREAM_TIMEOUT = int(os.getenv('FEED_STREAM_TIMEOUT', '300'))
+FEED_HEARTBEAT_INTERVAL = int(os.getenv('FEED_HEARTBEAT_INTERVAL', '15'))
+# Max Server-Sent Events streams and waiting long polls of process, every one holds a thread, so it must be less than
+# GUNICORN_THREADS.
+FEED_MAX_STREAMS = int(os.getenv('FEED_MAX_STREAMS', '2'))
+# Changes older than this number of days are pruned by prune_resource_changes command.
+FEED_RETENTION_DAYS = int(os.getenv('FEED_RETENTION_DAYS', '7'))
+# Running users deletion jobs, which are not updated for this number of seconds, are resumed by workers.
+USER_DELETION_STALE_TIMEOUT = int(os.getenv('USER_DELETION_STALE_TIMEOUT', '300'))
+
+USERS_IMPORT_BATCH_SIZE = int(os.getenv('USERS_IMPORT_BATCH_SIZE', '1000'))
+USERS_IMPORT_PROCESSES = int(os.getenv('USERS_IMPORT_PROCESSES', str(os.cpu_count() or 1)))
+# Max size of file uploaded for import in bytes, files are stored in database till they are imported by worker.
+USERS_IMPORT_MAX_SIZE = int(os.getenv('USERS_IMPORT_MAX_SIZE', str(10 * 1024 * 1024)))
+# Running import jobs, which are not updated for this number of seconds, are failed.
+USERS_IMPORT_STALE_TIMEOUT = int(os.getenv('USERS_IMPORT_STALE_TIMEOUT', '300'))
@@ -0,0 +1,415 @@
+import datetime
+import os
+import pstats
+import runpy
+import tempfile
+import threading
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock, skipUnless
+from uuid import uuid4
+
+import msgpack
+import psycopg2
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from resources.models import Resource, UserQuota
+from resources.serializers import ResourceSerializer, UserQuotaSerializer
+from users.models import User
+from users.serializers import UserSerializer
+from users.test_utils import UserClientMixin, random_string
+from . import renderers
+from .benchmark import SCENARIOS, run_benchmark
+from .checks import check_replica_stickiness_cache, check_throttling_cache
+from .db_router import ReplicaRouter, set_replica_reads, stick_to_primary, is_sticky
+from .parsers import FastJSONParser, MessagePackParser
+from .postgresql_pool.pool import ConnectionPool, pools_stats
+from .schema import schema_view
+from .throttling import TokenBucketThrottle
+from .warmup import warmup
+
+
+class WarmupTests(TestCase):
+    databases = '__all__'
+
+    def test_warmup(self):
+        warmup()
+
+
+class GunicornHooksTests(SimpleTestCase):
+    allow_database_queries = True
+
+    def in_use(self):
+        return sum(stats['in_use'] for stats in pools_stats() if stats['alias'] == 'default')
+
+    def test_post_fork_returns_connections(self):
+        config = runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+        in_use = self.in_use()
+        # Connections are thread local, the hook is run like in main thread of worker.
+        thread = threading.Thread(target=config['post_fork'], args=(None, None))
+        thread.start()
+        thread.join()
+        self.assertEqual(self.in_use(), in_use)
+
+
+class SchemaTests(SimpleTestCase):
+    def test_schema_is_generated_once(self):
+        self.client.get(reverse('schema-json', kwargs=dict(format='.json')))
+        with mock.patch.object(schema_view.generator_class, 'get_schema') as get_schema:
+            for format in ('.json', '.yaml'):
+                response = self.client.get(reverse('schema-json', kwargs=dict(format=format)))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIn('/resources/export', response.content.decode())
+                self.assertIn('max-age=', response['Cache-Control'])
+
+                response = self.client.get(reverse('schema-json', kwargs=dict(format=format)),
+                                           HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        get_schema.assert_not_called()
+
+    def test_ui_loads_precomputed_schema(self):
+        for name in ('schema-swagger-ui', 'schema-redoc'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(reverse('schema-json', kwargs=dict(format='.json')), response.content.decode())
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    allow_database_queries = True
+
+    def setUp(self) -> None:
+        self.pool = ConnectionPool(max_size=1, timeout=0.1)
+
+    def tearDown(self) -> None:
+        self.pool.close()
+
+    def connect(self):
+        return psycopg2.connect(**connection.get_connection_params())
+
+    def test_connection_is_reused(self):
+        first = self.pool.acquire(self.connect)
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(self.connect), first)
+        self.assertEqual(self.pool.stats()['connects'], 1)
+        self.assertEqual(self.pool.stats()['in_use'], 1)
+
+    def test_connections_count_is_capped(self):
+        self.pool.acquire(self.connect)
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.acquire(self.connect)
+        stats = self.pool.stats()
+        self.assertEqual((stats['size'], stats['waits'], stats['timeouts']), (1, 1, 1))
+
+    def test_broken_connection_is_replaced(self):
+        first = self.pool.acquire(self.connect)
+        self.pool.release(first)
+        with self.connect() as other, other.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [first.get_backend_pid()])
+        second = self.pool.acquire(self.connect)
+        self.assertIsNot(second, first)
+        self.assertEqual(self.pool.stats()['health_check_failures'], 1)
+        self.assertEqual(self.pool.stats()['size'], 1)
+
+    def test_transaction_is_rolled_back_on_release(self):
+        first = self.pool.acquire(self.connect)
+        first.cursor().execute('SELECT 1')
+        self.pool.release(first)
+        self.assertEqual(first.get_transaction_status(), psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+
+class DatabasePoolsTests(UserClientMixin, APITestCase):
+    def test_get_pools_stats(self):
+        response = self.user_client.get(reverse('db-pools'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.admin_client.get(reverse('db-pools'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pooled_aliases = [stats['alias'] for stats in response.json() if stats['alias'] == 'default']
+        self.assertEqual(pooled_aliases, ['default'] if connection.settings_dict['POOL_SIZE'] else [])
+
+
+class MetricsTests(UserClientMixin, APITestCase):
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.user_client.get(reverse('resources'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = dict(timing.split(';', 1)[0:2] for timing in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timings), {'db', 'auth', 'serializer', 'total'})
+        self.assertIn('queries', timings['db'])
+
+    def test_server_timing_is_disabled_by_default(self):
+        response = self.user_client.get(reverse('resources'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(METRICS_TOKEN='metrics-token')
+    def test_metrics(self):
+        self.user_client.get(reverse('resources'))
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer metrics-token')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",status="200",view="ResourcesViewSet.list"}', content)
+        self.assertIn('http_request_db_queries_bucket{le="1.0",view="ResourcesViewSet.list"}', content)
+
+    def test_metrics_token_is_required(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+        with override_settings(METRICS_TOKEN='metrics-token'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong-token')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ProfilingTests(UserClientMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(PROFILING_DIR=directory.name, PROFILING_MAX_PROFILES=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_profile_is_requested_by_staff(self):
+        response = self.admin_client.get(reverse('resources'), HTTP_X_PROFILE='1')
+        profile_id = response['X-Profile-Id']
+
+        response = self.admin_client.get(reverse('profiles'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile = response.json()[0]
+        self.assertEqual(profile['id'], profile_id)
+        self.assertEqual(profile['view'], 'ResourcesViewSet.list')
+        self.assertEqual(profile['user_id'], self.admin.pk)
+        self.assertEqual(profile['reason'], 'requested')
+
+        response = self.admin_client.get(reverse('profile', kwargs=dict(profile_id=profile_id)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with tempfile.NamedTemporaryFile() as file:
+            file.write(b''.join(response.streaming_content))
+            file.flush()
+            self.assertTrue(pstats.Stats(file.name).total_calls)
+
+    def test_profile_is_not_stored_for_common_user(self):
+        with mock.patch('simple_resources_api.middleware.Profile') as profile:
+            for client in (self.client, self.user_client):
+                response = client.get(reverse('resources'), {'profile': '1'})
+                self.assertNotIn('X-Profile-Id', response)
+        profile.assert_not_called()
+        self.assertEqual(self.admin_client.get(reverse('profiles')).json(), [])
+        self.assertEqual(self.user_client.get(reverse('profiles')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_sampled_profiles_are_limited(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            profile_ids = [self.user_client.get(reverse('resources'))['X-Profile-Id'] for _ in range(3)]
+        profiles = self.admin_client.get(reverse('profiles')).json()
+        self.assertEqual([profile['id'] for profile in profiles], profile_ids[:0:-1])
+        self.assertEqual({profile['reason'] for profile in profiles}, {'sampled'})
+        response = self.admin_client.get(reverse('profile', kwargs=dict(profile_id=profile_ids[0])))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(SimpleTestCase):
+    allow_database_queries = True
+
+    def setUp(self) -> None:
+        self.router = ReplicaRouter()
+        cache.clear()
+
+    def tearDown(self) -> None:
+        set_replica_reads(False)
+
+    def test_reads_are_routed_to_replica_if_allowed(self):
+        self.assertEqual(self.router.db_for_read(Resource), 'default')
+        set_replica_reads(True)
+        self.assertEqual(self.router.db_for_read(Resource), 'replica_1')
+        self.assertEqual(self.router.db_for_write(Resource), 'default')
+
+    def test_reads_in_transaction_are_routed_to_primary(self):
+        set_replica_reads(True)
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Resource), 'default')
+
+    def test_user_sticks_to_primary_after_write(self):
+        self.assertFalse(is_sticky(1))
+        stick_to_primary(1)
+        self.assertTrue(is_sticky(1))
+        self.assertFalse(is_sticky(2))
+        self.assertFalse(is_sticky(None))
+
+    def test_stickiness_is_not_checked_without_replicas(self):
+        stick_to_primary(1)
+        with override_settings(DATABASE_REPLICAS=[]), mock.patch.object(cache, 'get') as cache_get:
+            self.assertFalse(is_sticky(1))
+        cache_get.assert_not_called()
+
+
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SHARED_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                             'LOCATION': tempfile.gettempdir()}}
+
+
+class ChecksTests(SimpleTestCase):
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_process_local_cache_is_not_allowed_with_replicas(self):
+        with override_settings(DATABASE_REPLICAS=['replica_1']):
+            errors = check_replica_stickiness_cache(None)
+            self.assertEqual([error.id for error in errors], ['simple_resources_api.E001'])
+            with override_settings(CACHES=SHARED_CACHES):
+                self.assertEqual(check_replica_stickiness_cache(None), [])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(check_replica_stickiness_cache(None), [])
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_process_local_cache_is_not_allowed_for_shared_throttling(self):
+        with override_settings(THROTTLE_SHARED=True):
+            errors = check_throttling_cache(None)
+            self.assertEqual([error.id for error in errors], ['simple_resources_api.E002'])
+            with override_settings(CACHES=SHARED_CACHES):
+                self.assertEqual(check_throttling_cache(None), [])
+        with override_settings(THROTTLE_SHARED=False):
+            self.assertEqual(check_throttling_cache(None), [])
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'Replicas are not configured, e.g. by DB_REPLICA_HOSTS=localhost.')
+class ReplicaRoutingTests(UserClientMixin, APITransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    def get_replicas_queries(self, method, path, **kwargs):
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in settings.DATABASE_REPLICAS]
+        for context in contexts:
+            context.__enter__()
+        response = getattr(self.user_client, method)(path, **kwargs)
+        for context in contexts:
+            context.__exit__(None, None, None)
+        self.assertLess(response.status_code, status.HTTP_400_BAD_REQUEST)
+        return sum(len(context) for context in contexts)
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertGreater(self.get_replicas_queries('get', reverse('resources')), 0)
+        self.assertGreater(self.get_replicas_queries('get', reverse('me-user')), 0)
+
+    def test_user_reads_from_primary_after_write(self):
+        path = reverse('resources')
+        self.assertEqual(self.get_replicas_queries('post', path, data=dict(name=random_string())), 0)
+        self.assertEqual(self.get_replicas_queries('get', path), 0)
+        cache.clear()
+        self.assertGreater(self.get_replicas_queries('get', path), 0)
+
+
+class RenderersTests(UserClientMixin, APITestCase):
+    data = {
+        'id': 1,
+        'name': 'ресурс \u2028 "quoted"',
+        'created_at': datetime.datetime(2020, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+        'date': datetime.date(2020, 1, 2),
+        'price': Decimal('1.50'),
+        'uuid': uuid4(),
+        'items': [None, True, 1.5, {'nested': []}],
+    }
+
+    def test_fast_json_renderer_output_is_the_same(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(renderers.FastJSONRenderer().render(self.data), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(self.data), expected)
+
+    def test_fast_json_parser(self):
+        self.assertEqual(FastJSONParser().parse(BytesIO(b'{"a":[1,"\xd1\x8f"]}')), {'a': [1, 'я']})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"a":'))
+
+    def test_message_pack_parser(self):
+        self.assertEqual(MessagePackParser().parse(BytesIO(msgpack.packb({'a': [1, 'я']}))), {'a': [1, 'я']})
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(BytesIO(b'\xc1'))
+
+    def test_message_pack_request_and_response(self):
+        response = self.user_client.post(reverse('resources'), msgpack.packb({'name': 'resource'}),
+                                         content_type='application/msgpack', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        resource = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(resource['name'], 'resource')
+        response = self.user_client.get(reverse('resources'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content, raw=False), [resource])
+
+    def test_representations_have_different_etags(self):
+        response = self.user_client.post(reverse('resources'), {'name': 'resource'})
+        path = reverse('resource', kwargs=dict(pk=response.json()['id']))
+        response = self.user_client.get(path)
+        self.assertIn('Accept', response['Vary'])
+        etag = response['ETag']
+        response = self.user_client.get(path, HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Accept', response['Vary'])
+
+
+class ValuesListTests(UserClientMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        for name in ('resource', 'ресурс "\u2028"', 'b' * 200):
+            Resource.objects.create(user=self.user, name=name)
+        UserQuota.objects.filter(user=self.user).update(limit=10)
+
+    def assert_same_as_serializer(self, path, serializer_class, queryset, **params):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        response = self.admin_client.get(path, data=params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        if not params:
+            self.assertEqual(response.content, expected)
+        else:
+            self.assertEqual(JSONRenderer().render(response.data['results']), expected)
+
+    def test_values_list_is_same_as_serializer(self):
+        for path, serializer_class, queryset in (
+            (reverse('resources'), ResourceSerializer, Resource.objects.order_by('pk')),
+            (reverse('users-quota'), UserQuotaSerializer, UserQuota.objects.order_by('pk')),
+            (reverse('users'), UserSerializer, User.objects.order_by('pk')),
+        ):
+            self.assert_same_as_serializer(path, serializer_class, queryset)
+            self.assert_same_as_serializer(path, serializer_class, queryset[1:3], limit=2, offset=1)
+            self.assert_same_as_serializer(path, serializer_class, queryset[:2], limit=2, cursor='')
+
+    def test_cursor_pagination_of_values_list(self):
+        ids = []
+        response = self.admin_client.get(reverse('users-quota'), data=dict(limit=1, cursor=''))
+        while True:
+            ids.extend(item['user_id'] for item in response.json()['results'])
+            if response.json()['next'] is None:
+                break
+            response = self.admin_client.get(response.json()['next'])
+        self.assertEqual(ids, list(UserQuota.objects.order_by('pk').values_list('pk', flat=True)))
+
+
+class BenchmarkTests(APITransactionTestCase):
+    # Safe requests out of transaction are read from replicas, if they are configured.
+    databases = '__all__'
+
+    def test_run_benchmark(self):
+        results = run_benchmark(users=3, resources_per_user=5, requests=4, concurrency=2)
+        self.assertEqual(list(results['scenarios']), list(SCENARIOS))
+        for result in results['scenarios'].values():
+            self.assertEqual((result['requests'], result['errors']), (4, 0))
+            self.assertGreater(result['queries_per_request'], 0)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+
+    @mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', dict.fromkeys(
+        ('login_ip', 'login_email', 'register_ip', 'register_email'), '1/min'
+    ))
+    def test_benchmark_is_not_throttled(self):
+        results = run_benchmark(users=3, resources_per_user=5, requests=4, concurrency=2,
+                                scenarios=['register', 'login'])
+        for result in results['scenarios'].values():
+            self.assertEqual((result['errors'], result['throttled']), (0, 0))
+        self.assertEqual(TokenBucketThrottle.THROTTLE_RATES['login_ip'], '1/min')
@@ -0,0 +1,140 @@
+"""
+Token bucket throttling. Buckets are kept in process by default, they are shared by processes through Django cache
+if THROTTLE_SHARED setting is enabled.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework.views import APIView
+
+from .ttl_cache import TTLCache
+
+
+class LocalBucketStore:
+    """
+    In-process token buckets. Bucket is removed after it is refilled, least recently used buckets are evicted
+    if there are more than max_size buckets.
+    """
+
+    def __init__(self, max_size: int):
+        self._buckets = TTLCache(max_size, timeout=float('inf'))
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, period: float) -> float:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens, wait = refill(bucket, capacity, period)
+            self._buckets.set(key, (tokens, time.time()), timeout=period)
+            return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Token buckets in Django cache, e.g. in memcached or in files, so they are shared by processes.
+    Concurrent updates of a bucket are not atomic, so a few requests over the rate may be allowed.
+    """
+
+    def consume(self, key: str, capacity: int, period: float) -> float:
+        key = f'throttle:{key}'
+        tokens, wait = refill(cache.get(key), capacity, period)
+        cache.set(key, (tokens, time.time()), timeout=period)
+        return wait
+
+
+def refill(bucket: Optional[Tuple[float, float]], capacity: int, period: float) -> Tuple[float, float]:
+    """
+    Refills bucket by elapsed time and takes a token from it. Returns remaining tokens and time to wait for a token,
+    which is 0 if the token is taken.
+    """
+    rate = capacity / period
+    if bucket is None:
+        tokens = capacity
+    else:
+        tokens, updated_at = bucket
+        tokens = min(capacity, tokens + (time.time() - updated_at) * rate)
+    if tokens < 1:
+        return tokens, (1 - tokens) / rate
+    return tokens - 1, 0
+
+
+local_store = LocalBucketStore(settings.THROTTLE_MAX_BUCKETS)
+cache_store = CacheBucketStore()
+
+
+def get_bucket_store() -> Any:
+    return cache_store if settings.THROTTLE_SHARED else local_store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Throttles by token bucket of scope of the view with suffix of the throttle, e.g. login_ip.
+    Rate is capacity of bucket, bucket is refilled evenly during rate period.
+    """
+    scope_suffix = None
+
+    def __init__(self):
+        # Rate is determined by the view.
+        self.wait_time = 0
+
+    def allow_request(self, request: Request, view: APIView) -> bool:
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        self.scope = f'{scope}_{self.scope_suffix}'
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.wait_time = get_bucket_store().consume(key, self.num_requests, self.duration)
+        return not self.wait_time
+
+    def wait(self) -> Optional[float]:
+        return self.wait_time
+
+
+@contextmanager
+def throttling_disabled() -> Iterator[None]:
+    """
+    Disables token bucket throttling of process, e.g. for benchmark clients, which come from one IP.
+    """
+    rates = TokenBucketThrottle.THROTTLE_RATES
+    TokenBucketThrottle.THROTTLE_RATES = dict.fromkeys(rates)
+    try:
+        yield
+    finally:
+        TokenBucketThrottle.THROTTLE_RATES = rates
+
+
+class IPThrottle(TokenBucketThrottle):
+    scope_suffix = 'ip'
+
+    def get_cache_key(self, request: Request, view: APIView) -> Optional[str]:
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """
+    Throttles by email from request data, requests without email are not throttled.
+    """
+    scope_suffix = 'email'
+
+    def get_cache_key(self, request: Request, view: APIView) -> Optional[str]:
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        ident = hashlib.md5(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
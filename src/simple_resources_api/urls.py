@@ -19,9 +19,10 @@ from django.urls import include
 from users.urls import register_urlpatterns, auth_urlpatterns, users_urlpatterns
 from resources.urls import user_quota_urlpatterns, resources_urlpatterns
 from .schema import schema_view
+from .views import DatabasePoolsView, ProfilesView, ProfileView, metrics_view, schema_document_view
 
 urlpatterns = [
-    url(r'^api/swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+    url(r'^api/swagger(?P<format>\.json|\.yaml)$', schema_document_view, name='schema-json'),
     url(r'^api/swagger$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     url(r'^api/redoc$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     url(r'^api/v1/register', include(register_urlpatterns)),
@@ -29,4 +30,8 @@ urlpatterns = [
     url(r'^api/v1/users', include(users_urlpatterns)),
     url(r'^api/v1/quotas', include(user_quota_urlpatterns)),
     url(r'^api/v1/resources', include(resources_urlpatterns)),
+    url(r'^api/v1/internal/db-pools$', DatabasePoolsView.as_view(), name='db-pools'),
+    url(r'^api/v1/internal/metrics$', metrics_view, name='metrics'),
+    url(r'^api/v1/internal/profiles$', ProfilesView.as_view(), name='profiles'),
+    url(r'^api/v1/internal/profiles/(?P<profile_id>[0-9a-f]{32})$', ProfileView.as_view(), name='profile'),
 ]
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+from drf_yasg.utils import swagger_auto_schema
+from prometheus_client import CONTENT_TYPE_LATEST
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import generate_metrics
+from .postgresql_pool.pool import pools_stats
+from .profiling import get_profile_path, list_profiles
+from .schema import get_schema_document
+from .serializers import DatabasePoolStatsSerializer, ProfileSerializer
+
+
+class DatabasePoolsView(APIView):
+    """
+    Statistics of database connections pools of the process, which serves the request.
+    """
+    permission_classes = (IsAdminUser,)
+
+    @swagger_auto_schema(responses={status.HTTP_200_OK: DatabasePoolStatsSerializer(many=True)})
+    def get(self, request: Request) -> Response:
+        return Response(DatabasePoolStatsSerializer(pools_stats(), many=True).data)
+
+
+class ProfilesView(APIView):
+    """
+    Stored profiles of requests, newest first.
+    """
+    permission_classes = (IsAdminUser,)
+
+    @swagger_auto_schema(responses={status.HTTP_200_OK: ProfileSerializer(many=True)})
+    def get(self, request: Request) -> Response:
+        return Response(ProfileSerializer(list_profiles(), many=True).data)
+
+
+class ProfileView(APIView):
+    """
+    Profile in pstats format, e.g. it is read by python -m pstats or snakeviz.
+    """
+    permission_classes = (IsAdminUser,)
+
+    @swagger_auto_schema(responses={status.HTTP_200_OK: 'Profile in pstats format.'})
+    def get(self, request: Request, profile_id: str) -> FileResponse:
+        path = get_profile_path(profile_id)
+        if path is None:
+            raise Http404()
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof',
+                            content_type='application/octet-stream')
+
+
+@require_safe
+def schema_document_view(request: HttpRequest, format: str) -> HttpResponse:
+    """
+    Precomputed public schema in JSON or YAML format.
+    """
+    document = get_schema_document(format)
+    response = get_conditional_response(request, etag=document.etag)
+    if response is None:
+        response = HttpResponse(document.content, content_type=document.content_type)
+    response['ETag'] = document.etag
+    patch_cache_control(response, public=True, max_age=settings.SCHEMA_CACHE_MAX_AGE)
+    return response
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Metrics in Prometheus text format, they are available by METRICS_TOKEN in bearer Authorization header.
+    """
+    if not settings.METRICS_TOKEN:
+        raise Http404()
+    if not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(generate_metrics(), content_type=CONTENT_TYPE_LATEST)
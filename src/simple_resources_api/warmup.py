@@ -0,0 +1,56 @@
+"""
+Warmup of the application before accepting traffic, used by gunicorn hooks.
+"""
+import logging
+
+from django.db import connections
+from django.urls import get_resolver, URLPattern, URLResolver
+from rest_framework.serializers import Serializer
+
+from .schema import generate_schema_documents
+
+logger = logging.getLogger(__name__)
+
+
+def iter_views(resolver: URLResolver):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_views(pattern)
+        elif isinstance(pattern, URLPattern):
+            yield pattern.callback
+
+
+def warmup_urls() -> None:
+    resolver = get_resolver()
+    # Populates reverse dictionaries and imports all views.
+    resolver.reverse_dict
+
+
+def warmup_serializers() -> None:
+    serializer_classes = set()
+    for view in iter_views(get_resolver()):
+        view_class = getattr(view, 'cls', None)
+        serializer_classes.add(getattr(view_class, 'serializer_class', None))
+        serializer_classes.update(getattr(view_class, 'action2serializer_class', {}).values())
+
+    for serializer_class in serializer_classes:
+        if isinstance(serializer_class, type) and issubclass(serializer_class, Serializer):
+            serializer_class().fields
+
+
+def warmup_schema() -> None:
+    generate_schema_documents()
+
+
+def warmup_database() -> None:
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def warmup() -> None:
+    warmup_urls()
+    warmup_serializers()
+    warmup_schema()
+    warmup_database()
+    logger.info('Application is warmed up.')
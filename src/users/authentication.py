@@ -0,0 +1,86 @@
+import time
+import uuid
+from typing import Any, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+from simple_resources_api.metrics import timed
+from simple_resources_api.ttl_cache import TTLCache
+from .models import User
+
+# Only fields required by permissions are loaded, the others are deferred.
+USER_FIELDS = ('id', 'is_staff', 'is_active')
+
+users_cache = TTLCache(settings.AUTH_USERS_CACHE_SIZE, settings.AUTH_USERS_CACHE_TIMEOUT)
+tokens_cache = TTLCache(settings.AUTH_TOKENS_CACHE_SIZE, settings.AUTH_TOKENS_CACHE_TIMEOUT)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication, which caches validated tokens until they expire and users fields required by permissions.
+    Cached users are invalidated on user saving and deleting: in other processes by version of user in shared cache,
+    which is checked on every hit.
+    """
+
+    @timed('auth')
+    def authenticate(self, request: Request) -> Optional[Tuple[User, Token]]:
+        return super().authenticate(request)
+
+    def get_validated_token(self, raw_token: bytes) -> Token:
+        validated_token = tokens_cache.get(raw_token)
+        if validated_token is not None and validated_token['exp'] > time.time():
+            return validated_token
+
+        validated_token = super().get_validated_token(raw_token)
+        tokens_cache.set(raw_token, validated_token, validated_token['exp'] - time.time())
+        return validated_token
+
+    def get_user(self, validated_token: Token) -> User:
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        version = get_user_version(user_id)
+        cached = users_cache.get(user_id)
+        if cached is not None and cached[0] == version:
+            values = cached[1]
+        else:
+            values = self.get_user_values(user_id)
+            users_cache.set(user_id, (version, values))
+
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, values)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return user
+
+    def get_user_values(self, user_id: int) -> Tuple:
+        values = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(*USER_FIELDS).first()
+        if values is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        return values
+
+
+def get_user_version(user_id: int) -> Any:
+    return cache.get(f'auth-user-version:{user_id}')
+
+
+def bump_user_version(user_id: int) -> None:
+    # Version outlives cached users, so users cached before the change are always reloaded.
+    cache.set(f'auth-user-version:{user_id}', uuid.uuid4().hex, settings.AUTH_USERS_CACHE_TIMEOUT)
+
+
+def invalidate_user(user_id: int) -> None:
+    users_cache.delete(user_id)
+    bump_user_version(user_id)
+    # Other processes may cache the user again before the change is committed.
+    transaction.on_commit(lambda: bump_user_version(user_id))
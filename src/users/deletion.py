@@ -0,0 +1,70 @@
+"""
+Background deletion of users with resources. Resources are deleted by chunks, then quota and the user.
+Every step is idempotent, so jobs interrupted by crash of worker are resumed from the remaining resources.
+"""
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import F, ProtectedError, Q
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from resources.models import Resource, UserQuota
+from .models import User, UserDeletionJob
+
+logger = logging.getLogger(__name__)
+
+
+def claim_job(stale_timeout: float) -> Optional[UserDeletionJob]:
+    """
+    Takes the oldest pending job or running job, which is not updated for stale_timeout seconds.
+    Jobs locked by other workers are skipped.
+    """
+    stale = timezone.now() - timedelta(seconds=stale_timeout)
+    with transaction.atomic():
+        job = (
+            UserDeletionJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=UserDeletionJob.PENDING) | Q(status=UserDeletionJob.RUNNING, updated_at__lt=stale))
+            .order_by('pk')
+            .first()
+        )
+        if job is None:
+            return None
+        if job.resources_total is None:
+            job.resources_total = Resource.objects.filter(user_id=job.user_id).count()
+        job.status = UserDeletionJob.RUNNING
+        job.attempts += 1
+        job.started_at = job.started_at or timezone.now()
+        job.save()
+    return job
+
+
+def run_job(job: UserDeletionJob, chunk_size: int) -> UserDeletionJob:
+    def chunk_deleted(count: int) -> None:
+        UserDeletionJob.objects.filter(pk=job.pk).update(
+            resources_deleted=F('resources_deleted') + count, updated_at=Now()
+        )
+
+    try:
+        while True:
+            Resource.objects.filter(user_id=job.user_id).delete_by_chunks(chunk_size, on_chunk=chunk_deleted)
+            try:
+                with transaction.atomic():
+                    UserQuota.objects.filter(user_id=job.user_id).delete()
+                    User.objects.filter(pk=job.user_id).delete()
+                break
+            except ProtectedError:
+                # Resources are created by requests, which were authenticated before the user was deactivated.
+                continue
+    except Exception as e:
+        logger.exception('Deletion of user %s is failed.', job.user_id)
+        job.status = UserDeletionJob.FAILED
+        job.error = str(e)
+    else:
+        job.status = UserDeletionJob.DONE
+    job.refresh_from_db(fields=['resources_deleted'])
+    job.finished_at = timezone.now()
+    job.save()
+    return job
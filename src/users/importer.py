@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.db import transaction, IntegrityError
+from django.db.models.functions import Now
+from django.utils import timezone
+from rest_framework import serializers
+
+from resources.models import UserQuota
+from .models import User, UserImportJob
+
+logger = logging.getLogger(__name__)
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = (CSV, NDJSON)
+
+
+class UserImportSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    password = serializers.CharField(validators=(validate_password,))
+    first_name = serializers.CharField(required=False, allow_blank=True, max_length=30)
+    last_name = serializers.CharField(required=False, allow_blank=True, max_length=150)
+    limit = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def read_rows(file: IO, format: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reads rows from CSV file with header or from file with JSON object per line.
+    """
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding='utf-8')
+
+    if format == CSV:
+        for row in csv.DictReader(file):
+            # Empty limit means unlimited quota.
+            if row.get('limit') == '':
+                row['limit'] = None
+            yield row
+    elif format == NDJSON:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise ImportFormatError(f'Line {line_number} is not valid JSON.')
+    else:
+        raise ImportFormatError(f'Unknown format {format}, must be one of: {", ".join(FORMATS)}.')
+
+
+class UsersImporter:
+    """
+    Imports users by batches: passwords are hashed in process pool, emails uniqueness is checked by one query
+    and users with quotas are inserted by bulk_create.
+    """
+
+    def __init__(self, batch_size: int, processes: int,
+                 on_batch: Optional[Callable[['UsersImporter'], None]] = None):
+        self.batch_size = batch_size
+        self.processes = processes
+        self.on_batch = on_batch
+        self.created = 0
+        self.errors = []
+
+    def run(self, rows: Iterable[Dict[str, Any]]) -> 'UsersImporter':
+        executor = ProcessPoolExecutor(self.processes) if self.processes > 1 else None
+        try:
+            rows = enumerate(rows, start=1)
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self.import_batch(batch, executor)
+                if self.on_batch is not None:
+                    self.on_batch(self)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.errors.sort(key=lambda error: error['row'])
+        return self
+
+    def import_batch(self, batch: List[Tuple[int, Any]], executor: Optional[Executor]) -> None:
+        valid_rows = []
+        emails = set()
+        for row_number, row in batch:
+            serializer = UserImportSerializer(data=row)
+            if not serializer.is_valid():
+                self.errors.append({'row': row_number, 'errors': serializer.errors})
+            elif serializer.validated_data['email'] in emails:
+                self.errors.append({'row': row_number, 'errors': {'email': ['Email is duplicated in import.']}})
+            else:
+                emails.add(serializer.validated_data['email'])
+                valid_rows.append((row_number, serializer.validated_data))
+
+        passwords = [data['password'] for _, data in valid_rows]
+        hashes = list(executor.map(make_password, passwords, chunksize=max(len(passwords) // self.processes, 1))
+                      if executor is not None else map(make_password, passwords))
+
+        # Concurrently registered users lead to integrity error, so emails are checked again.
+        for attempt in range(2):
+            try:
+                created, errors = self.insert(valid_rows, hashes)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+        self.created += created
+        self.errors.extend(errors)
+
+    @transaction.atomic()
+    def insert(self, rows: List[Tuple[int, Dict[str, Any]]], hashes: List[str]) -> Tuple[int, List[Dict[str, Any]]]:
+        existing_emails = set(
+            User.objects.filter(email__in=[data['email'] for _, data in rows]).values_list('email', flat=True)
+        )
+        users = []
+        limits = []
+        errors = []
+        for (row_number, data), password in zip(rows, hashes):
+            if data['email'] in existing_emails:
+                errors.append({'row': row_number, 'errors': {'email': ['User with this email already exists.']}})
+                continue
+            users.append(User(email=data['email'], password=password, first_name=data.get('first_name', ''),
+                              last_name=data.get('last_name', '')))
+            limits.append(data.get('limit'))
+
+        User.objects.bulk_create(users)
+        UserQuota.objects.bulk_create([UserQuota(user=user, limit=limit) for user, limit in zip(users, limits)])
+        return len(users), errors
+
+
+def claim_import_job(stale_timeout: float) -> Optional[UserImportJob]:
+    """
+    Takes the oldest pending job, jobs locked by other workers are skipped. Running jobs, which are not updated
+    for stale_timeout seconds, are failed: their batches are committed, so they are not resumed.
+    """
+    stale = timezone.now() - timedelta(seconds=stale_timeout)
+    UserImportJob.objects.filter(status=UserImportJob.RUNNING, updated_at__lt=stale).update(
+        status=UserImportJob.FAILED, error='Import is interrupted.', data=b'', finished_at=Now(), updated_at=Now()
+    )
+    with transaction.atomic():
+        job = (
+            UserImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=UserImportJob.PENDING)
+            .order_by('pk')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = UserImportJob.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'updated_at'])
+    return job
+
+
+def run_import_job(job: UserImportJob, batch_size: int, processes: int) -> UserImportJob:
+    def batch_imported(importer: UsersImporter) -> None:
+        UserImportJob.objects.filter(pk=job.pk).update(created=importer.created, updated_at=Now())
+
+    importer = UsersImporter(batch_size, processes, on_batch=batch_imported)
+    try:
+        importer.run(read_rows(io.BytesIO(job.data), job.format))
+    except Exception as e:
+        if not isinstance(e, ImportFormatError):
+            logger.exception('Import %s is failed.', job.pk)
+        job.status = UserImportJob.FAILED
+        job.error = str(e)
+    else:
+        job.status = UserImportJob.DONE
+    job.created = importer.created
+    job.errors = json.dumps(sorted(importer.errors, key=lambda error: error['row']))
+    job.data = b''
+    job.finished_at = timezone.now()
+    job.save()
+    return job
@@ -0,0 +1,29 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importer import UsersImporter, read_rows, FORMATS, ImportFormatError
+
+
+class Command(BaseCommand):
+    help = 'Imports users with quotas limits from CSV file with header or from NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to file with users.')
+        parser.add_argument('--format', choices=FORMATS, help='Format of file, by default it is got from extension.')
+        parser.add_argument('--batch-size', type=int, default=settings.USERS_IMPORT_BATCH_SIZE)
+        parser.add_argument('--processes', type=int, default=settings.USERS_IMPORT_PROCESSES,
+                            help='Number of processes for passwords hashing.')
+
+    def handle(self, *args, path: str, format: str, batch_size: int, processes: int, **options):
+        format = format or os.path.splitext(path)[1].lstrip('.').lower()
+        try:
+            with open(path, encoding='utf-8') as file:
+                importer = UsersImporter(batch_size, processes).run(read_rows(file, format))
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+
+        for error in importer.errors:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(f'Imported {importer.created} users, {len(importer.errors)} rows failed.'))
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.deletion import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Processes jobs of users deletion: deletes resources by chunks, then quotas and users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=settings.RESOURCES_DELETE_CHUNK_SIZE,
+                            help='Number of resources deleted in one transaction.')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between checks of new jobs.')
+        parser.add_argument('--stale-timeout', type=float, default=settings.USER_DELETION_STALE_TIMEOUT,
+                            help='Running jobs, which are not updated for this time, are resumed.')
+        parser.add_argument('--once', action='store_true', help='Exit when there are no jobs.')
+
+    def handle(self, *args, chunk_size: int, poll_interval: float, stale_timeout: float, once: bool, **options):
+        while True:
+            close_old_connections()
+            job = claim_job(stale_timeout)
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f'Deleting user {job.user_id}, attempt {job.attempts}.')
+            job = run_job(job, chunk_size)
+            message = f'User {job.user_id}: {job.status}, {job.resources_deleted} resources are deleted.'
+            self.stdout.write(self.style.SUCCESS(message) if job.status == job.DONE else self.style.ERROR(message))
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.importer import claim_import_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = 'Processes jobs of users import: users of uploaded files are imported by batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.USERS_IMPORT_BATCH_SIZE)
+        parser.add_argument('--processes', type=int, default=settings.USERS_IMPORT_PROCESSES,
+                            help='Number of processes for passwords hashing.')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between checks of new jobs.')
+        parser.add_argument('--stale-timeout', type=float, default=settings.USERS_IMPORT_STALE_TIMEOUT,
+                            help='Running jobs, which are not updated for this time, are failed.')
+        parser.add_argument('--once', action='store_true', help='Exit when there are no jobs.')
+
+    def handle(self, *args, batch_size: int, processes: int, poll_interval: float, stale_timeout: float, once: bool,
+               **options):
+        while True:
+            close_old_connections()
+            job = claim_import_job(stale_timeout)
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f'Importing users of job {job.pk}.')
+            job = run_import_job(job, batch_size, processes)
+            message = f'Job {job.pk}: {job.status}, {job.created} users are imported.'
+            self.stdout.write(self.style.SUCCESS(message) if job.status == job.DONE else self.style.ERROR(message))
@@ -1,5 +1,9 @@
+import json
+from typing import Any, Dict, List
+
 from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
 
@@ -18,6 +22,7 @@ class UserManager(DjangoUserManager):
 
 class User(AbstractUser):
     email = models.EmailField(_('email address'), unique=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     username = None
     USERNAME_FIELD = 'email'
@@ -28,3 +33,82 @@ class User(AbstractUser):
     def __init__(self, *args, **kwargs):
         kwargs.pop('username', None)
         super().__init__(*args, **kwargs)
+
+
+class UserDeletionJobQuerySet(models.QuerySet):
+    def schedule(self, user: User) -> 'UserDeletionJob':
+        """
+        Deactivates the user, so new resources are not created, and returns unfinished deletion job of the user
+        or a new one.
+        """
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=['is_active', 'updated_at'])
+            job, _ = self.get_or_create(
+                user_id=user.pk, status__in=UserDeletionJob.UNFINISHED_STATUSES, defaults={'email': user.email}
+            )
+        return job
+
+
+class UserDeletionJob(models.Model):
+    """
+    Job of background deletion of user with resources, which is processed by process_user_deletions command.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (PENDING, RUNNING, DONE, FAILED)
+    UNFINISHED_STATUSES = (PENDING, RUNNING)
+
+    # The user is deleted by the job, so it is not a foreign key.
+    user_id = models.IntegerField(db_index=True)
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=[(status, status) for status in STATUSES], default=PENDING)
+    resources_total = models.PositiveIntegerField(null=True, default=None)
+    resources_deleted = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Updated by worker after every chunk, running jobs which are not updated for a long time are resumed.
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, default=None)
+    finished_at = models.DateTimeField(null=True, default=None)
+
+    objects = UserDeletionJobQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_id'], condition=Q(status__in=('pending', 'running')), name='user_deletion_job_unfinished'
+            ),
+        ]
+
+
+class UserImportJob(models.Model):
+    """
+    Job of background import of users file, which is processed by process_user_imports command.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (PENDING, RUNNING, DONE, FAILED)
+
+    format = models.CharField(max_length=10)
+    # Uploaded file, it is cleared when the job is finished.
+    data = models.BinaryField(editable=False)
+    status = models.CharField(max_length=10, choices=[(status, status) for status in STATUSES], default=PENDING)
+    created = models.PositiveIntegerField(default=0)
+    # JSON list of errors of rows.
+    errors = models.TextField(default='[]')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Updated by worker after every batch.
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, default=None)
+    finished_at = models.DateTimeField(null=True, default=None)
+
+    @property
+    def error_list(self) -> List[Dict[str, Any]]:
+        return json.loads(self.errors)
@@ -1,11 +1,14 @@
+import os
 from typing import Any, Dict
 
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from .models import User
+from .importer import FORMATS
+from .models import User, UserDeletionJob, UserImportJob
 
 
 class RegistrationSerializer(serializers.Serializer):
@@ -38,6 +41,14 @@ class AccessRefreshTokensSerializer(serializers.Serializer):
     refresh = serializers.CharField()
 
 
+class RefreshedTokensSerializer(serializers.Serializer):
+    """
+    Serializer for token refresh response, used in schema views. Refresh token is returned if rotation is enabled.
+    """
+    access = serializers.CharField()
+    refresh = serializers.CharField(required=False)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -48,3 +59,40 @@ class MeUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'email', 'first_name', 'last_name')
+
+
+class UsersImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+
+    def validate_file(self, file: Any) -> Any:
+        if file.size > settings.USERS_IMPORT_MAX_SIZE:
+            raise serializers.ValidationError(f'File must not be larger than {settings.USERS_IMPORT_MAX_SIZE} bytes.')
+        return file
+
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        if 'format' not in attrs:
+            attrs['format'] = os.path.splitext(attrs['file'].name)[1].lstrip('.').lower()
+            if attrs['format'] not in FORMATS:
+                raise serializers.ValidationError({'format': ['Cannot be detected by file name.']})
+        return attrs
+
+
+class UserImportJobSerializer(serializers.ModelSerializer):
+    errors = serializers.ListField(child=serializers.DictField(), source='error_list', read_only=True)
+
+    class Meta:
+        model = UserImportJob
+        fields = (
+            'id', 'format', 'status', 'created', 'errors', 'error', 'created_at', 'updated_at', 'started_at',
+            'finished_at',
+        )
+
+
+class UserDeletionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserDeletionJob
+        fields = (
+            'id', 'user_id', 'email', 'status', 'resources_total', 'resources_deleted', 'attempts', 'error',
+            'created_at', 'updated_at', 'started_at', 'finished_at',
+        )
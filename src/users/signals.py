@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User, dispatch_uid="invalidate_cached_user_by_user_saved")
+def user_saved(sender, instance: User, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=User, dispatch_uid="invalidate_cached_user_by_user_deleted")
+def user_deleted(sender, instance: User, **kwargs):
+    invalidate_user(instance.pk)
@@ -4,6 +4,7 @@ import string
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
+from simple_resources_api.throttling import local_store
 from .models import User
 
 
@@ -25,6 +26,8 @@ class UserClientMixin:
         return reverse('login')
 
     def setUp(self) -> None:
+        # Clients of all tests log in from the same IP.
+        local_store.clear()
         self.admin_email = random_email()
         self.admin_password = random_string()
         self.admin = self.create_user(self.admin_email, self.admin_password, True)
@@ -1,11 +1,23 @@
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO, BytesIO
 from typing import Callable
+from unittest import mock
 
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.reverse import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 
+from simple_resources_api.throttling import LocalBucketStore, TokenBucketThrottle, refill
+from .authentication import bump_user_version
+from .importer import claim_import_job, run_import_job
 from .test_utils import UserClientMixin, random_email, random_string
-from .models import User
+from resources.models import Resource, UserQuota
+from .models import User, UserDeletionJob, UserImportJob
 
 
 class RegistrationTests(UserClientMixin, APITestCase):
@@ -39,6 +51,29 @@ class AuthorizationTests(UserClientMixin, APITestCase):
         response = self.admin_client.post(self.login_path, {'email': self.admin_email, 'password': self.admin_password})
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_refresh_token(self):
+        response = self.client.post(self.login_path, {'email': self.user_email, 'password': self.user_password})
+        response = self.client.post(reverse('login-refresh'), {'refresh': response.json()['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["access"]}')
+        response = self.client.get(reverse('me-user'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['id'], self.user.id)
+
+    def test_refresh_token_by_access_token(self):
+        response = self.client.post(self.login_path, {'email': self.user_email, 'password': self.user_password})
+        response = self.client.post(reverse('login-refresh'), {'refresh': response.json()['access']})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_verify_token(self):
+        response = self.client.post(self.login_path, {'email': self.user_email, 'password': self.user_password})
+        response = self.client.post(reverse('login-verify'), {'token': response.json()['access']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_verify_invalid_token(self):
+        response = self.client.post(reverse('login-verify'), {'token': random_string()})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
 
 class UsersTests(UserClientMixin, APITestCase):
 
@@ -101,6 +136,99 @@ class UsersTests(UserClientMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(User.objects.filter(email=self.user_email).exists())
 
+    @override_settings(USERS_IMPORT_PROCESSES=2, USERS_IMPORT_BATCH_SIZE=2)
+    def test_import_users_admin(self):
+        emails = [random_email() for _ in range(3)]
+        file = BytesIO('\n'.join([
+            'email,password,limit,first_name',
+            f'{emails[0]},{random_string()},5,{random_string()}',
+            f'{emails[1]},{random_string()},,',
+            f'{self.user_email},{random_string()},,',
+            f'{emails[0]},{random_string()},,',
+            f'{emails[2]},123,,',
+            f'not-email,{random_string()},,',
+        ]).encode())
+        file.name = 'users.csv'
+        response = self.admin_client.post(reverse('users-import'), {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()['status'], UserImportJob.PENDING)
+        self.assertFalse(User.objects.filter(email=emails[0]).exists())
+
+        job = claim_import_job(stale_timeout=60)
+        run_import_job(job, batch_size=2, processes=1)
+        response = self.admin_client.get(response['Location'])
+        self.assertEqual(response.json()['status'], UserImportJob.DONE)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [3, 4, 5, 6])
+        self.assertEqual(bytes(UserImportJob.objects.get(pk=job.pk).data), b'')
+        self.assertIsNone(claim_import_job(stale_timeout=60))
+        self.assertEqual(UserQuota.objects.get(user__email=emails[0]).limit, 5)
+        self.assertIsNone(UserQuota.objects.get(user__email=emails[1]).limit)
+        self.assertFalse(User.objects.filter(email=emails[2]).exists())
+
+    def test_import_users_unknown_format(self):
+        file = BytesIO(b'')
+        file.name = 'users.txt'
+        response = self.admin_client.post(reverse('users-import'), {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(USERS_IMPORT_MAX_SIZE=10)
+    def test_import_users_too_large_file(self):
+        file = BytesIO(b'email,password\n')
+        file.name = 'users.csv'
+        response = self.admin_client.post(reverse('users-import'), {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file', response.json())
+        self.assertFalse(UserImportJob.objects.exists())
+
+    def test_import_job_with_invalid_file_is_failed(self):
+        job = UserImportJob.objects.create(format='ndjson', data=b'{"email": \n')
+        run_import_job(claim_import_job(stale_timeout=60), batch_size=2, processes=1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, UserImportJob.FAILED)
+        self.assertEqual(job.error, 'Line 1 is not valid JSON.')
+
+    def test_stale_import_job_is_failed(self):
+        job = UserImportJob.objects.create(format='csv', data=b'email,password\n')
+        UserImportJob.objects.filter(pk=job.pk).update(status=UserImportJob.RUNNING,
+                                                       updated_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNone(claim_import_job(stale_timeout=60))
+        job.refresh_from_db()
+        self.assertEqual(job.status, UserImportJob.FAILED)
+
+    def test_import_users_command(self):
+        email = random_email()
+        password = random_string()
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as file:
+            file.write(json.dumps({'email': email, 'password': password, 'limit': 1}) + '\n')
+            file.flush()
+            call_command('import_users', file.name, processes=1, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(UserQuota.objects.get(user__email=email).limit, 1)
+        response = self.client.post(self.login_path, {'email': email, 'password': password})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_export_users_admin(self):
+        response = self.admin_client.get(reverse('users-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], list(User.objects.order_by('pk').values_list(
+            'pk', flat=True)))
+        response = self.admin_client.get(reverse('users-export'), data=dict(format='csv'))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,email,first_name,last_name,is_staff')
+        self.assertEqual(len(lines), User.objects.count() + 1)
+
+    def test_export_users_user(self):
+        response = self.user_client.get(reverse('users-export'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_users_user(self):
+        response = self.user_client.post(reverse('users-import'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.user_client.get(reverse('user-imports'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_users_list_user(self):
         response = self.user_client.get(self.users_path)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -145,6 +273,13 @@ class MeUsersTests(UserClientMixin, APITestCase):
             }
         )
 
+    def test_get_user_not_modified(self):
+        response = self.user_client.get(self.user_path)
+        response = self.user_client.get(self.user_path, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.user_client.get(self.user_path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def _assert_update_method(self, request_method: Callable) -> None:
         first_name = random_string()
         last_name = random_string()
@@ -165,3 +300,151 @@ class MeUsersTests(UserClientMixin, APITestCase):
     def test_delete_user(self):
         response = self.user_client.delete(self.user_path)
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class CachedAuthenticationTests(UserClientMixin, APITestCase):
+
+    @property
+    def user_path(self):
+        return reverse('me-user')
+
+    def test_user_is_not_queried_by_cached_authentication(self):
+        path = reverse('resource', kwargs=dict(pk=Resource.objects.create(user=self.user, name=random_string()).pk))
+        self.user_client.get(path)
+        with self.assertNumQueries(1):
+            response = self.user_client.get(path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_inactive_user(self):
+        self.user_client.get(self.user_path)
+        self.user.is_active = False
+        self.user.save()
+        response = self.user_client.get(self.user_path)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_staff(self):
+        self.admin_client.get(reverse('users'))
+        self.admin.is_staff = False
+        self.admin.save()
+        response = self.admin_client.get(reverse('users'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deleted_user(self):
+        self.user_client.get(self.user_path)
+        self.user.delete()
+        response = self.user_client.get(self.user_path)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_changed_by_other_process(self):
+        self.user_client.get(self.user_path)
+        # Other process doesn't clear cache of this process, but bumps version of the user in shared cache.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        bump_user_version(self.user.pk)
+        response = self.user_client.get(self.user_path)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UserDeletionTests(UserClientMixin, APITransactionTestCase):
+    # Safe requests out of transaction are read from replicas, if they are configured.
+    databases = '__all__'
+
+    def setUp(self) -> None:
+        super().setUp()
+        for number in range(3):
+            Resource.objects.create(user=self.user, name=f'resource-{number}')
+
+    def process_deletions(self):
+        call_command('process_user_deletions', '--once', '--chunk-size', '2', stdout=StringIO())
+
+    def test_delete_user_with_resources(self):
+        # Authenticated admin is cached, resources are only checked for existence and are not collected.
+        self.admin_client.get(reverse('users'))
+        with self.assertNumQueries(7):
+            response = self.admin_client.delete(reverse('user', kwargs=dict(pk=self.user.pk)))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = response.json()
+        self.assertEqual(job['status'], UserDeletionJob.PENDING)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        response = self.admin_client.delete(reverse('user', kwargs=dict(pk=self.user.pk)))
+        self.assertEqual(response.json()['id'], job['id'])
+
+        self.process_deletions()
+        response = self.admin_client.get(response['Location'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], UserDeletionJob.DONE)
+        self.assertEqual(response.json()['resources_total'], 3)
+        self.assertEqual(response.json()['resources_deleted'], 3)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(UserQuota.objects.filter(user_id=self.user.pk).exists())
+        self.assertFalse(Resource.objects.filter(user_id=self.user.pk).exists())
+
+    def test_stale_job_is_resumed(self):
+        job = UserDeletionJob.objects.schedule(self.user)
+        UserDeletionJob.objects.filter(pk=job.pk).update(status=UserDeletionJob.RUNNING, attempts=1)
+        self.process_deletions()
+        self.assertEqual(UserDeletionJob.objects.get(pk=job.pk).status, UserDeletionJob.RUNNING)
+
+        UserDeletionJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.process_deletions()
+        job.refresh_from_db()
+        self.assertEqual(job.status, UserDeletionJob.DONE)
+        self.assertEqual(job.attempts, 2)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_deletions_user(self):
+        self.assertEqual(self.user_client.get(reverse('user-deletions')).status_code, status.HTTP_403_FORBIDDEN)
+        UserDeletionJob.objects.schedule(self.user)
+        response = self.admin_client.get(reverse('user-deletions'), {'user_id': self.user.pk})
+        self.assertEqual([job['user_id'] for job in response.json()], [self.user.pk])
+
+
+@mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', {
+    'login_ip': '5/min', 'login_email': '2/min', 'register_ip': '2/min', 'register_email': None,
+})
+class ThrottlingTests(UserClientMixin, APITestCase):
+    def test_login_is_throttled_by_email_before_password_checking(self):
+        for _ in range(2):
+            response = self.client.post(self.login_path, {'email': self.user_email, 'password': random_string()})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        with mock.patch('django.contrib.auth.backends.ModelBackend.authenticate') as authenticate:
+            response = self.client.post(self.login_path, {'email': self.user_email.upper(),
+                                                          'password': random_string()})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(response['Retry-After']), 30)
+        authenticate.assert_not_called()
+
+        response = self.client.post(self.login_path, {'email': self.admin_email, 'password': self.admin_password})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_login_is_throttled_by_ip(self):
+        for _ in range(5):
+            self.client.post(self.login_path, {'email': random_email(), 'password': random_string()})
+        response = self.client.post(self.login_path, {'email': self.user_email, 'password': self.user_password})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post(reverse('login-verify'), {'token': random_string()})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_register_is_throttled_by_ip(self):
+        for _ in range(2):
+            response = self.client.post(self.register_path, {'email': random_email(), 'password': random_string()})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(self.register_path, {'email': random_email(), 'password': random_string()})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post(self.register_path, {'email': random_email(), 'password': random_string()},
+                                    REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_bucket_is_refilled(self):
+        with mock.patch('time.time', return_value=1000):
+            self.assertEqual(refill(None, 2, 60), (1, 0))
+            self.assertEqual(refill((0, 1000), 2, 60), (0, 30))
+            self.assertEqual(refill((0, 970), 2, 60), (0, 0))
+            self.assertEqual(refill((1, 0), 2, 60), (1, 0))
+
+    def test_buckets_are_evicted(self):
+        store = LocalBucketStore(max_size=2)
+        for key in ('a', 'b', 'c'):
+            store.consume(key, 1, 60)
+        self.assertEqual(len(store._buckets), 2)
+        self.assertEqual(store.consume('a', 1, 60), 0)
+        self.assertGreater(store.consume('c', 1, 60), 0)
@@ -1,21 +1,31 @@
 from django.urls import path
 
-from .views import RegisterViewSet, AuthViewSet, UserViewSet, MeUserViewSet
+from .views import (
+    RegisterViewSet, AuthViewSet, UserViewSet, MeUserViewSet, UserDeletionJobViewSet, UserImportJobViewSet,
+)
 
 register_urlpatterns = [
     path(r'', RegisterViewSet.as_view({'post': 'create'}), name='register')
 ]
 
 auth_urlpatterns = [
-    path(r'', AuthViewSet.as_view({'post': 'obtain_token'}), name='login')
+    path(r'', AuthViewSet.as_view({'post': 'obtain_token'}), name='login'),
+    path(r'/refresh', AuthViewSet.as_view({'post': 'refresh_token'}), name='login-refresh'),
+    path(r'/verify', AuthViewSet.as_view({'post': 'verify_token'}), name='login-verify'),
 ]
 
 users_urlpatterns = [
     path(r'', UserViewSet.as_view({'post': 'create', 'get': 'list'}), name='users'),
+    path(r'/import', UserViewSet.as_view({'post': 'import_users'}), name='users-import'),
+    path(r'/export', UserViewSet.as_view({'get': 'export'}), name='users-export'),
     path(r'/<int:pk>', UserViewSet.as_view({'get': 'retrieve',
                                             'delete': 'destroy',
                                             'put': 'update',
                                             'patch': 'partial_update'}), name='user'),
+    path(r'/deletions', UserDeletionJobViewSet.as_view({'get': 'list'}), name='user-deletions'),
+    path(r'/deletions/<int:pk>', UserDeletionJobViewSet.as_view({'get': 'retrieve'}), name='user-deletion'),
+    path(r'/imports', UserImportJobViewSet.as_view({'get': 'list'}), name='user-imports'),
+    path(r'/imports/<int:pk>', UserImportJobViewSet.as_view({'get': 'retrieve'}), name='user-import'),
     path(r'/me', MeUserViewSet.as_view({'get': 'retrieve',
                                         'put': 'update',
                                         'patch': 'partial_update'}), name='me-user'),
@@ -1,4 +1,4 @@
-from typing import Any, Type
+from typing import Any, List, Type
 
 from django.db.models import ProtectedError
 from django.http import JsonResponse
@@ -9,27 +9,67 @@ from rest_framework.permissions import NOT, IsAuthenticated, SingleOperandHolder
 
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework.serializers import Serializer, ValidationError
-from rest_framework.viewsets import GenericViewSet, ModelViewSet
-
-from .models import User
+from rest_framework.serializers import Serializer
+from rest_framework.throttling import BaseThrottle
+from rest_framework.reverse import reverse
+from rest_framework.viewsets import GenericViewSet, ModelViewSet, ReadOnlyModelViewSet
+from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer, TokenVerifySerializer
+
+from resources.models import Resource
+from simple_resources_api.mixins import (
+    ConditionalGetMixin, ReplicaReadMixin, StreamingExportMixin, ValuesListMixin
+)
+from simple_resources_api.throttling import EmailThrottle, IPThrottle
+from .models import User, UserDeletionJob, UserImportJob
 from .serializers import (
     RegistrationSerializer,
     AuthTokenSerializer,
     UserSerializer,
     MeUserSerializer,
-    AccessRefreshTokensSerializer
+    AccessRefreshTokensSerializer,
+    RefreshedTokensSerializer,
+    UsersImportSerializer,
+    UserImportJobSerializer,
+    UserDeletionJobSerializer
 )
 
 
 class RegisterViewSet(CreateModelMixin, GenericViewSet):
     permission_classes = (SingleOperandHolder(NOT, IsAuthenticated),)
     serializer_class = RegistrationSerializer
+    # Throttles are checked before validation, so before password validation and hashing.
+    throttle_classes = (IPThrottle, EmailThrottle)
+    throttle_scope = 'register'
 
 
 class AuthViewSet(GenericViewSet):
     permission_classes = (AllowAny,)
     serializer_class = AuthTokenSerializer
+    throttle_classes = (IPThrottle, EmailThrottle)
+    throttle_scope = 'login'
+
+    action2serializer_class = {
+        'refresh_token': TokenRefreshSerializer,
+        'verify_token': TokenVerifySerializer,
+    }
+
+    def get_serializer_class(self) -> Type[Serializer]:
+        return self.action2serializer_class.get(self.action, super().get_serializer_class())
+
+    def get_throttles(self) -> List[BaseThrottle]:
+        # Only login checks password.
+        if self.action != 'obtain_token':
+            return []
+        return super().get_throttles()
+
+    def _validate_token(self, request: Request) -> Serializer:
+        serializer: Serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        return serializer
 
     @swagger_auto_schema(responses={status.HTTP_201_CREATED: AccessRefreshTokensSerializer()})
     def obtain_token(self, request: Request, *args: Any, **kwargs: Any) -> JsonResponse:
@@ -37,30 +77,97 @@ class AuthViewSet(GenericViewSet):
         serializer.is_valid(raise_exception=True)
         return JsonResponse(data=serializer.validated_data, status=status.HTTP_201_CREATED)
 
+    @swagger_auto_schema(responses={status.HTTP_201_CREATED: RefreshedTokensSerializer()})
+    def refresh_token(self, request: Request, *args: Any, **kwargs: Any) -> JsonResponse:
+        serializer = self._validate_token(request)
+        return JsonResponse(data=serializer.validated_data, status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(responses={status.HTTP_200_OK: 'Token is valid.'})
+    def verify_token(self, request: Request, *args: Any, **kwargs: Any) -> JsonResponse:
+        serializer = self._validate_token(request)
+        return JsonResponse(data=serializer.validated_data, status=status.HTTP_200_OK)
+
 
-class UserViewSet(ModelViewSet):
-    queryset = User.objects.all()
+class UserViewSet(ReplicaReadMixin, ConditionalGetMixin, StreamingExportMixin, ValuesListMixin, ModelViewSet):
+    queryset = User.objects.order_by('pk')
     serializer_class = UserSerializer
     permission_classes = (IsAdminUser,)
 
     action2serializer_class = {
-        'create': RegistrationSerializer
+        'create': RegistrationSerializer,
+        'import_users': UsersImportSerializer,
     }
 
     def get_serializer_class(self) -> Type[Serializer]:
         return self.action2serializer_class.get(self.action, super().get_serializer_class())
 
+    @swagger_auto_schema(responses={status.HTTP_202_ACCEPTED: UserImportJobSerializer()})
+    def import_users(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Users are imported by background job, the file is stored in the job till it is processed.
+        """
+        serializer: Serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = UserImportJob.objects.create(format=serializer.validated_data['format'],
+                                           data=serializer.validated_data['file'].read())
+        location = reverse('user-import', kwargs=dict(pk=job.pk), request=request)
+        return Response(UserImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+                        headers={'Location': location})
+
+    @swagger_auto_schema(responses={
+        status.HTTP_204_NO_CONTENT: 'User is deleted.',
+        status.HTTP_202_ACCEPTED: UserDeletionJobSerializer(),
+    })
     def destroy(self, request: Request, *args, **kwargs) -> Response:
-        try:
-            return super().destroy(request, *args, **kwargs)
-        except ProtectedError:
-            raise ValidationError({'detail': 'Cannot delete the user because other objects is referenced to it.'})
-
-
-class MeUserViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, GenericViewSet):
-    queryset = User.objects.all()
+        """
+        Users without resources are deleted at once, users with resources are deleted by background job.
+        """
+        user = self.get_object()
+        # Deletion collects protected resources before failing, so users with resources are not deleted here.
+        if not Resource.objects.filter(user=user).exists():
+            try:
+                self.perform_destroy(user)
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            except ProtectedError:
+                # Resource is created concurrently.
+                pass
+        job = UserDeletionJob.objects.schedule(user)
+        location = reverse('user-deletion', kwargs=dict(pk=job.pk), request=request)
+        return Response(UserDeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+                        headers={'Location': location})
+
+
+class MeUserViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    GenericViewSet
+):
+    queryset = User.objects.order_by('pk')
     serializer_class = MeUserSerializer
     permission_classes = (IsAuthenticated,)
 
     def get_object(self) -> User:
-        return self.request.user
+        # Authenticated user has only fields required by permissions, so the full one is fetched.
+        return self.get_queryset().get(pk=self.request.user.pk)
+
+
+class UserDeletionJobViewSet(ReadOnlyModelViewSet):
+    """
+    Status and progress of users deletion jobs.
+    """
+    queryset = UserDeletionJob.objects.order_by('pk')
+    serializer_class = UserDeletionJobSerializer
+    permission_classes = (IsAdminUser,)
+    filterset_fields = ('user_id', 'status')
+
+
+class UserImportJobViewSet(ReadOnlyModelViewSet):
+    """
+    Status and results of users import jobs.
+    """
+    queryset = UserImportJob.objects.defer('data').order_by('pk')
+    serializer_class = UserImportJobSerializer
+    permission_classes = (IsAdminUser,)
+    filterset_fields = ('status',)
@@ -2,4 +2,10 @@
 
 set -euo pipefail
 
-python ./manage.py migrate && python ./manage.py runserver 0.0.0.0:8000
+python ./manage.py migrate
+
+if [ "${DEBUG:-0}" = "1" ]; then
+    exec python ./manage.py runserver 0.0.0.0:8000
+fi
+
+exec gunicorn --config gunicorn.conf.py